@@ -0,0 +1,55 @@
+"""
+Startup cost of the app config: what acMain pays for Config() with a complete config.ini,
+with a missing one (all defaults written back) and for serializing every option.
+
+usage: python bench/bench_config.py [repeats]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import fake_ac
+
+
+def best_of(fn, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    directory = tempfile.mkdtemp(prefix='bench_config_')
+    try:
+        fake_ac.install(csp=True, config_dir=directory)
+        from _telemetry_overlay import config as config_module
+        Config = config_module.Config
+        path = config_module.config_path
+
+        # complete file written by the app itself
+        config = Config()
+        config.writer.wait()
+
+        def load_missing():
+            os.remove(path)
+            Config().writer.wait()
+
+        print('{:<28} {:>10}'.format('case', 'us'))
+        for label, fn in [
+            ('load complete config.ini', Config),
+            ('load missing config.ini', load_missing),
+            ('serialize all options', lambda: [config.serialize(name) for name in config_module.OPTIONS]),
+        ]:
+            print('{:<28} {:>10.1f}'.format(label, best_of(fn, repeats) * 1e6))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Per sample cost of CSPGraph.add_values in shift mode versus ring buffer mode,
+and of batched add_columns calls when several samples arrive in one frame.
+
+Uses the counting fake ac module. Pixels are estimated from the rectangles that are
+cleared, copied or drawn inside a render target, which is what the GPU pays for.
+
+usage: python bench/bench_csp_graph.py [samples]
+"""
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_ac
+
+COLORS = [(1, 1, 1, 1)] * 8
+
+
+def main():
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    ac, sim = fake_ac.install(csp=True)
+    from _telemetry_overlay.widgets import CSPGraph
+
+    print('{:<6} {:>6} {:>6} {:>10} {:>10} {:>8} {:>8} {:>12}'.format(
+        'mode', 'width', 'trace', 'us/sample', 'ac calls', 'draws', 'binds', 'pixels'))
+    for width in [300, 1000]:
+        for trace_width in [1, 2, 5]:
+            for ring_buffer in [False, True]:
+                graph = CSPGraph(0, 0, width, 100, trace_width, ring_buffer)
+                graph.setup()
+
+                values = [(0.5, 0.5, color) for color in COLORS]
+                ac.reset_calls()
+                start = time.perf_counter()
+                for i in range(samples):
+                    value = 0.5 + 0.5 * math.sin(i / 20)
+                    values = [(prev, value, color) for (_, prev, color) in values]
+                    graph.add_values(values)
+                elapsed = time.perf_counter() - start
+
+                counts = ac.gl.counts
+                print('{:<6} {:>6} {:>6} {:>10.2f} {:>10.1f} {:>8.1f} {:>8.1f} {:>12.0f}'.format(
+                    'ring' if ring_buffer else 'shift',
+                    width,
+                    trace_width,
+                    elapsed / samples * 1e6,
+                    ac.total_calls() / samples,
+                    counts['draw_calls'] / samples,
+                    counts['binds'] / samples,
+                    counts['target_pixels'] / samples,
+                ))
+
+    print()
+    print('{:<6} {:>6} {:>10} {:>10} {:>8} {:>12}'.format('mode', 'batch', 'us/column', 'binds/col', 'draws/col', 'pixels/col'))
+    for batch in [1, 2, 4, 8]:
+        for ring_buffer in [False, True]:
+            graph = CSPGraph(0, 0, 1000, 100, 2, ring_buffer)
+            graph.setup()
+
+            column = [(0.4, 0.6, color) for color in COLORS]
+            ac.reset_calls()
+            start = time.perf_counter()
+            for i in range(samples // batch):
+                graph.add_columns([column] * batch)
+            elapsed = time.perf_counter() - start
+
+            total = samples // batch * batch
+            counts = ac.gl.counts
+            print('{:<6} {:>6} {:>10.2f} {:>10.2f} {:>8.2f} {:>12.0f}'.format(
+                'ring' if ring_buffer else 'shift',
+                batch,
+                elapsed / total * 1e6,
+                counts['binds'] / total,
+                counts['draw_calls'] / total,
+                counts['target_pixels'] / total,
+            ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Lap edge check of DeltaTimer with simulated laps.
+
+Every scenario drives the same constant speed laps, so the delta over the whole last lap
+should stay about zero. The scenarios differ only in how the lap line is crossed: the lap count
+and the track position do not change in the same sample in AC, so a lap may start at a
+position just below 1.
+
+usage: python bench/bench_delta.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'telemetry_overlay'))
+
+from _telemetry_overlay.delta import DeltaTimer
+
+LAP_MS = 90000
+SAMPLES = 900
+# largest delta (s) accepted during the last lap
+MAX_DELTA = 0.5
+
+
+def lap_samples(lap, first_position=None, wrap_late=0):
+    """
+    (lap, position, lap_time) samples of one lap. `first_position` replaces the position of the
+    first sample, `wrap_late` keeps the previous lap position for that many samples.
+    """
+    for i in range(SAMPLES + 1):
+        position = i / SAMPLES
+        if i == 0 and first_position is not None:
+            position = first_position
+        elif i < wrap_late:
+            position = 1 - (wrap_late - i) / 10000
+        yield lap, min(position, 0.9999), LAP_MS * i // SAMPLES
+
+
+def run(laps):
+    """Feed the laps, return the timer and the largest delta (s) seen during the last lap"""
+    timer = DeltaTimer()
+    worst = 0.0
+    for samples in laps:
+        worst = 0.0
+        for lap, position, lap_time in samples:
+            worst = max(worst, abs(timer.update(lap, position, lap_time)))
+    return timer, worst
+
+
+SCENARIOS = [
+    ('clean laps', lambda: [lap_samples(0), lap_samples(1)]),
+    ('first sample at 0.9995', lambda: [lap_samples(0), lap_samples(1, first_position=0.9995)]),
+    ('position wraps 3 samples late', lambda: [lap_samples(0), lap_samples(1, wrap_late=3)]),
+    ('both laps start at 0.9995', lambda: [lap_samples(0, first_position=0.9995), lap_samples(1, first_position=0.9995)]),
+]
+
+
+def main():
+    print('{:<32} {:>10} {:>14} {:>8}'.format('scenario', 'best ms', 'worst delta s', 'status'))
+    failed = 0
+    for name, laps in SCENARIOS:
+        timer, worst = run(laps())
+        ok = timer.valid and timer.best_time and worst <= MAX_DELTA
+        failed += not ok
+        print('{:<32} {:>10} {:>14.3f} {:>8}'.format(name, timer.best_time, worst, 'ok' if ok else 'FAIL'))
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
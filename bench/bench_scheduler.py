@@ -0,0 +1,70 @@
+"""
+Simulated clock check of RateScheduler against the old reset-to-zero timer.
+
+Frame times are generated from a seeded random source, so every run is identical.
+For each frame rate / jitter / sample rate combination the achieved sample rate
+of both approaches is compared with the requested one.
+
+usage: python bench/bench_scheduler.py [seconds]
+"""
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'telemetry_overlay'))
+
+from _telemetry_overlay.scheduler import RateScheduler
+
+FRAME_RATES = [30, 60, 144]
+JITTER = [0.0, 0.2, 0.5]
+SAMPLE_RATES = [10, 40, 60, 100]
+
+
+def frame_times(fps, jitter, seconds, seed=1):
+    rng = random.Random(seed)
+    period = 1 / fps
+    elapsed = 0.0
+    while elapsed < seconds:
+        dt = period * (1 + rng.uniform(-jitter, jitter))
+        elapsed += dt
+        yield dt
+
+
+def reset_timer_rate(rate, frames, seconds):
+    """The previous App.on_update behaviour: one sample and timer = 0 once the period elapsed"""
+    timeout = 1 / rate
+    timer = 0.0
+    samples = 0
+    for dt in frames:
+        timer += dt
+        if timer >= timeout:
+            timer = 0.0
+            samples += 1
+    return samples / seconds
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 120
+
+    print('{:>5} {:>7} {:>10} {:>12} {:>12} {:>8}'.format('fps', 'jitter', 'requested', 'reset timer', 'scheduler', 'dropped'))
+    worst = 0.0
+    for fps in FRAME_RATES:
+        for jitter in JITTER:
+            for rate in SAMPLE_RATES:
+                frames = list(frame_times(fps, jitter, seconds))
+                scheduler = RateScheduler(rate, max_catch_up=max(1, rate // 4))
+                for dt in frames:
+                    scheduler.advance(dt)
+
+                achieved = scheduler.achieved_rate()
+                worst = max(worst, abs(achieved - rate) / rate)
+                print('{:>5} {:>7} {:>10} {:>12.2f} {:>12.2f} {:>8}'.format(
+                    fps, jitter, rate, reset_timer_rate(rate, frames, sum(frames)), achieved, scheduler.dropped))
+
+    print()
+    print('worst scheduler rate error: {:.3f}%'.format(worst * 100))
+    return 0 if worst < 0.01 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
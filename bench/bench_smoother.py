@@ -0,0 +1,64 @@
+"""
+Micro benchmark for the g force denoising buffers.
+
+Compares the old list based path (pop(0) trimming + sum() per read) with RingSmoother
+for denoise_g 1..50 at several sample rates. Every sample does one push and two reads,
+matching what App.on_update does per channel.
+
+usage: python bench/bench_smoother.py [seconds]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'telemetry_overlay'))
+
+from _telemetry_overlay.buffers import RingSmoother
+
+SAMPLE_RATES = [10, 40, 60, 100]
+DENOISE_VALUES = [1, 2, 5, 10, 20, 30, 40, 50]
+
+
+def run_list(samples, denoise_g):
+    values = []
+    for sample in samples:
+        while len(values) >= denoise_g: values.pop(0)
+        values.append(sample)
+        sum(values) / len(values)
+        sum(values) / len(values)
+
+
+def run_ring(samples, denoise_g):
+    smoother = RingSmoother(denoise_g)
+    for sample in samples:
+        smoother.push(sample)
+        smoother.mean()
+        smoother.mean()
+
+
+def timed(fn, samples, denoise_g, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(samples, denoise_g)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 60
+
+    print('simulated session: {}s'.format(seconds))
+    print('{:>6} {:>9} {:>14} {:>14} {:>8}'.format('rate', 'denoise', 'list us/sample', 'ring us/sample', 'speedup'))
+    for rate in SAMPLE_RATES:
+        samples = [random.uniform(-3, 3) for _ in range(int(rate * seconds))]
+        for denoise_g in DENOISE_VALUES:
+            t_list = timed(run_list, samples, denoise_g) / len(samples) * 1e6
+            t_ring = timed(run_ring, samples, denoise_g) / len(samples) * 1e6
+            print('{:>6} {:>9} {:>14.3f} {:>14.3f} {:>7.2f}x'.format(rate, denoise_g, t_list, t_ring, t_list / t_ring))
+
+
+if __name__ == '__main__':
+    main()
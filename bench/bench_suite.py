@@ -0,0 +1,347 @@
+"""
+Benchmark suite for the update and render hot paths, with regression checks.
+
+Every case reports time per call, tracemalloc peak memory, ac calls and GL draw calls per call.
+Results are compared with bench/baseline.json; the run fails when a case makes more ac or draw
+calls than the baseline, or allocates more than the baseline plus the threshold. Those numbers come
+from the counting fake ac module and do not depend on the machine.
+Wall clock times are compared after normalizing by a fixed pure python calibration loop run after
+every case. They move a lot between runs on a shared machine, so a case only fails on time when it
+is more than --time-ratio times slower than the baseline in every one of TIME_RETRIES runs.
+
+The baseline keeps one entry per case. A change should only update the cases it adds or
+intentionally changes (--update-baseline --filter TEXT), and say why in its commit message.
+Regenerating every case moves the reference of unrelated hot paths, so it needs --all.
+
+usage:
+    python bench/bench_suite.py [--update-baseline [--all]] [--threshold 0.5] [--time-ratio 2]
+                                [--calls N] [--filter TEXT]
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_ac
+from replay import Replay, synthetic_stream
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+REPEATS = 20
+# runs per case when updating the baseline, the median one is stored
+BASELINE_RUNS = 5
+# runs of a case before a time regression fails the suite, the fastest one counts
+TIME_RETRIES = 3
+
+ALL_TRACES = {
+    'show_throttle': True,
+    'show_brake': True,
+    'show_clutch': True,
+    'show_steering': True,
+    'show_handbrake': True,
+    'show_gx': True,
+    'show_gz': True,
+    'show_ffb': True,
+}
+RENDER_OPTIONS = {
+    'show_throttle_bar': True,
+    'show_brake_bar': True,
+    'show_clutch_bar': True,
+    'show_handbrake_bar': True,
+    'show_ffb_bar': True,
+    'show_bar_value': True,
+    'show_wheel': True,
+    'show_graph_lines': True,
+    'show_telemetry_label': True,
+}
+
+
+def measure(ac, setup_call, calls, repeats=REPEATS):
+    """
+    Run `setup_call()` to get the function to time, then time `calls` invocations of it.
+    Time is the fastest of `repeats` rounds, the other rounds mostly measure the machine.
+    """
+    fn = setup_call()
+    # warm up, first calls may create targets or fill buffers
+    for _ in range(min(calls, 50)):
+        fn()
+
+    elapsed = None
+    for _ in range(repeats):
+        ac.reset_calls()
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        round_time = time.perf_counter() - start
+        elapsed = round_time if elapsed is None else min(elapsed, round_time)
+    ac_calls = ac.total_calls() / calls
+    draw_calls = ac.gl.counts['draw_calls'] / calls
+
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    for _ in range(calls):
+        fn()
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+
+    return {
+        'us': elapsed / calls * 1e6,
+        'peak_kb': peak / 1024,
+        'ac_calls': ac_calls,
+        'draw_calls': draw_calls,
+    }
+
+
+def calibrate(repeats=REPEATS):
+    """Fastest time (us) of a fixed python workload, similar in shape to the hot paths"""
+    values = [(0.5, 0.25, (1, 1, 1, 1))] * 8
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for i in range(200):
+            total = 0.0
+            for prev, value, color in values:
+                total += (value - prev) * color[0] + math.sin(i)
+            [v for v in values if v[1] > total]
+        elapsed = (time.perf_counter() - start) * 1e6
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def app_update_case(sample_rate):
+    def run(calls):
+        options = dict(ALL_TRACES, sample_rate=sample_rate)
+        replay = Replay(csp=True, options=options)
+        stream = synthetic_stream()
+        clock = {'t': 0.0}
+        dt = 1 / sample_rate
+
+        def setup():
+            def step():
+                clock['t'] += dt
+                state = stream(clock['t'])
+                replay.sim.set_lap(state.pop('lap'), state.pop('sector'), state.pop('lap_time'), state.pop('position'))
+                replay.sim.step(**state)
+                replay.app.on_update(dt)
+            return step
+        return measure(replay.ac, setup, calls)
+    return run
+
+
+def app_render_case(csp):
+    def run(calls):
+        options = dict(ALL_TRACES, **RENDER_OPTIONS)
+        replay = Replay(csp=csp, options=options)
+        replay.run(synthetic_stream(), 60)
+        return measure(replay.ac, lambda: lambda: replay.app.on_render(1 / 60), calls)
+    return run
+
+
+def widgets_render_case(csp):
+    def run(calls):
+        options = dict(RENDER_OPTIONS, pedals_base_stop=True)
+        replay = Replay(csp=csp, options=options)
+        replay.run(synthetic_stream(), 60)
+        app = replay.app
+
+        def setup():
+            def step():
+                app.pedals.render()
+                app.wheel.render()
+            return step
+        return measure(replay.ac, setup, calls)
+    return run
+
+
+def csp_graph_case(ring_buffer):
+    def run(calls):
+        ac, sim = fake_ac.install(csp=True)
+        from _telemetry_overlay.widgets import CSPGraph
+
+        graph = CSPGraph(0, 0, 1000, 100, 2, ring_buffer)
+        graph.setup()
+        colors = [(1, 1, 1, 1)] * 8
+        counter = {'i': 0}
+
+        def setup():
+            def step():
+                counter['i'] += 1
+                value = 0.5 + 0.5 * math.sin(counter['i'] / 20)
+                graph.add_values([(0.5, value, color) for color in colors])
+            return step
+        return measure(ac, setup, calls)
+    return run
+
+
+def ac_graph_case(trace_size):
+    def run(calls):
+        ac, sim = fake_ac.install(csp=False)
+        from _telemetry_overlay.widgets import ACGraph
+
+        graph = ACGraph(window=1, x=0, y=0, width=300, height=100, trace_width=trace_size)
+        traces = [graph.add_trace((1, 1, 1, 1)) for _ in range(7)]
+        counter = {'i': 0}
+
+        def setup():
+            def step():
+                counter['i'] += 1
+                value = 0.5 + 0.5 * math.sin(counter['i'] / 20)
+                for trace in traces:
+                    trace.add_value(value)
+            return step
+        return measure(ac, setup, calls)
+    return run
+
+
+def line_graph_case(trace_size, sample=True):
+    """
+    One sample and one frame of the drawn graph used without CSP, or only a frame
+    (render rate above the sample rate) when `sample` is False
+    """
+    def run(calls):
+        ac, sim = fake_ac.install(csp=False)
+        from _telemetry_overlay.widgets import LineGraph
+
+        graph = LineGraph(x=0, y=0, width=300, height=100, trace_width=trace_size)
+        traces = [graph.add_trace((1, 1, 1, 1)) for _ in range(7)]
+        counter = {'i': 0}
+
+        def add_values():
+            counter['i'] += 1
+            for i, trace in enumerate(traces):
+                trace.add_value(0.5 + 0.5 * math.sin(counter['i'] / (10 + i * 5)))
+
+        def setup():
+            if not sample:
+                for _ in range(graph.width):
+                    add_values()
+                return graph.render
+
+            def step():
+                add_values()
+                graph.render()
+            return step
+        return measure(ac, setup, calls)
+    return run
+
+
+def cases():
+    result = []
+    for rate in [1, 10, 40, 100]:
+        result.append(('app.on_update all traces @{}Hz'.format(rate), app_update_case(rate)))
+    result.append(('app.on_render full layout', app_render_case(True)))
+    result.append(('app.on_render full layout vanilla', app_render_case(False)))
+    result.append(('Pedals + Wheel render', widgets_render_case(True)))
+    result.append(('Pedals + Wheel render vanilla', widgets_render_case(False)))
+    result.append(('CSPGraph.add_values shift', csp_graph_case(False)))
+    result.append(('CSPGraph.add_values ring', csp_graph_case(True)))
+    for size in [1, 2, 5, 10]:
+        result.append(('ACGraph 7 traces trace_size={}'.format(size), ac_graph_case(size)))
+    for size in [1, 2, 5]:
+        result.append(('LineGraph 7 traces trace_size={}'.format(size), line_graph_case(size)))
+    result.append(('LineGraph 7 traces redraw trace_size=2', line_graph_case(2, sample=False)))
+    return result
+
+
+def check(result, baseline, threshold, time_ratio):
+    """Return a list of regressions of `result` against `baseline`"""
+    problems = []
+    relative = relative_time(result, baseline)
+    if relative > time_ratio:
+        problems.append('time x{:.2f} > x{:.2f}'.format(relative, time_ratio))
+    # small absolute slack, tracemalloc peaks move by a few hundred bytes between runs
+    if result['peak_kb'] > baseline['peak_kb'] * (1 + threshold) + 1:
+        problems.append('memory {:.1f}kB > {:.1f}kB'.format(result['peak_kb'], baseline['peak_kb']))
+    if result['ac_calls'] > baseline['ac_calls'] + 1e-6:
+        problems.append('ac calls {:.2f} > {:.2f}'.format(result['ac_calls'], baseline['ac_calls']))
+    if result['draw_calls'] > baseline.get('draw_calls', result['draw_calls']) + 1e-6:
+        problems.append('draw calls {:.2f} > {:.2f}'.format(result['draw_calls'], baseline['draw_calls']))
+    return problems
+
+
+def relative_time(result, baseline):
+    """Time of `result` relative to the baseline, both normalized by their calibration loop"""
+    return (result['us'] / result['calibration_us']) / (baseline['us'] / baseline['calibration_us'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--threshold', type=float, default=0.5, help='allowed relative growth of the peak memory')
+    parser.add_argument('--time-ratio', type=float, default=2.0, help='allowed slowdown of the normalized time')
+    parser.add_argument('--calls', type=int, default=250, help='calls per timing round')
+    parser.add_argument('--filter', default='')
+    parser.add_argument('--all', action='store_true', help='allow --update-baseline to rewrite every case')
+    args = parser.parse_args()
+
+    if args.update_baseline and not args.filter and not args.all:
+        parser.error('--update-baseline rewrites every case without --filter, pass --all if that is intended')
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+
+    results = {}
+    failed = []
+    print('{:<40} {:>10} {:>8} {:>10} {:>10} {:>10}  {}'.format('case', 'us/call', 'vs base', 'peak kB', 'ac calls', 'draws', 'status'))
+    for name, run in cases():
+        if args.filter not in name:
+            continue
+
+        # a baseline taken from one lucky run makes every later run look like a regression
+        runs = []
+        for _ in range(BASELINE_RUNS if args.update_baseline else 1):
+            result = run(args.calls)
+            # calibrate right after every case, machine speed drifts during the run
+            result['calibration_us'] = calibrate()
+            runs.append(result)
+        runs.sort(key=lambda r: r['us'] / r['calibration_us'])
+        result = runs[len(runs) // 2]
+        results[name] = result
+
+        status = 'new'
+        relative = ''
+        if name in baseline and not args.update_baseline:
+            problems = check(result, baseline[name], args.threshold, args.time_ratio)
+            retries = 1
+            # a slow run is usually the machine, only fail when the case stays slow
+            while problems and retries < TIME_RETRIES and relative_time(result, baseline[name]) > args.time_ratio:
+                retry = run(args.calls)
+                retry['calibration_us'] = calibrate()
+                if relative_time(retry, baseline[name]) < relative_time(result, baseline[name]):
+                    result = retry
+                    results[name] = result
+                problems = check(result, baseline[name], args.threshold, args.time_ratio)
+                retries += 1
+            status = 'REGRESSION: ' + ', '.join(problems) if problems else 'ok'
+            if problems:
+                failed.append(name)
+            relative = 'x{:.2f}'.format(relative_time(result, baseline[name]))
+        elif name in baseline:
+            status = 'updated'
+            relative = 'x{:.2f}'.format(relative_time(result, baseline[name]))
+
+        print('{:<40} {:>10.2f} {:>8} {:>10.2f} {:>10.2f} {:>10.2f}  {}'.format(
+            name, result['us'], relative, result['peak_kb'], result['ac_calls'], result['draw_calls'], status))
+
+    if args.update_baseline:
+        baseline.update({name: {k: round(v, 3) for k, v in result.items()} for name, result in results.items()})
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print('baseline written to', BASELINE_PATH)
+        return 0
+
+    if failed:
+        print('{} case(s) regressed'.format(len(failed)))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""
+Compare the two telemetry sources of TelemetryData: per field ac.getCarState calls
+versus a single read of the shared memory physics page.
+
+Runs against the fake ac module with file backed mmaps, so absolute times only show
+the python side of the cost. The ac call counts are what matters inside the game,
+every getCarState call is a round trip into the sim.
+
+usage: python bench/bench_telemetry_source.py [updates]
+"""
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_ac
+
+
+def run(ac, sim, telemetry, updates, duplicate_every=0):
+    ac.reset_calls()
+    start = time.perf_counter()
+    for i in range(updates):
+        # duplicate_every > 0 leaves some frames unchanged, like a sim running slower than the sample rate
+        if not duplicate_every or i % duplicate_every:
+            t = i / 100
+            sim.step(
+                gas=0.5 + 0.5 * math.sin(t),
+                brake=max(0.0, math.cos(t)),
+                steer=math.sin(t / 3),
+                acc_g=(math.sin(t) * 2, 0.0, math.cos(t) * 1.5),
+                gear=3,
+                speed_kmh=120 + 40 * math.sin(t / 5),
+                ffb=0.6,
+            )
+        telemetry.update_telemetry()
+    elapsed = time.perf_counter() - start
+    return elapsed / updates * 1e6, ac.total_calls() / updates
+
+
+def main():
+    updates = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    ac, sim = fake_ac.install(csp=True)
+    from _telemetry_overlay.config import Config
+    from _telemetry_overlay.data import TelemetryData
+
+    config = Config()
+    telemetry = TelemetryData(True, config)
+
+    print('{:<32} {:>10} {:>14}'.format('source', 'us/update', 'ac calls/update'))
+    for label, shared, duplicate_every in [
+        ('getCarState', False, 0),
+        ('shared memory', True, 0),
+        ('getCarState, 1/2 dup frames', False, 2),
+        ('shared memory, 1/2 dup frames', True, 2),
+    ]:
+        config.use_shared_memory = shared
+        sim.step(steer=0.5)
+        telemetry.update_globals()
+        us, calls = run(ac, sim, telemetry, updates, duplicate_every)
+        print('{:<32} {:>10.2f} {:>14.2f}'.format(label, us, calls))
+
+
+if __name__ == '__main__':
+    main()
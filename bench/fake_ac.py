@@ -0,0 +1,307 @@
+"""
+Stand-in for the Assetto Corsa python environment, so the app can be imported and driven on Linux.
+
+install() registers fake `ac` and `acsys` modules that count every call, and loads
+lib/sim_info.py on top of file backed mmaps instead of the named Windows mappings.
+FakeSim writes telemetry into those mmaps and answers ac.getCarState from the same state,
+so both telemetry sources see identical data.
+"""
+import collections
+import mmap
+import os
+import sys
+import tempfile
+import types
+
+_real_mmap = mmap.mmap
+
+APP_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'telemetry_overlay')
+
+
+class CS:
+    SpeedMS = 0
+    SpeedMPH = 1
+    SpeedKMH = 2
+    Gas = 3
+    Brake = 4
+    Clutch = 5
+    Gear = 6
+    BestLap = 7
+    CGHeight = 8
+    DriftBestLap = 9
+    DriftLastLap = 10
+    DriftPoints = 11
+    DriveTrainSpeed = 12
+    RPM = 13
+    InstantDrift = 14
+    IsDriftInvalid = 15
+    IsEngineLimiterOn = 16
+    LapCount = 17
+    LapInvalidated = 18
+    LapTime = 19
+    LastFF = 20
+    LastLap = 21
+    LocalAngularVelocity = 22
+    LocalVelocity = 23
+    NormalizedSplinePosition = 24
+    PerformanceMeter = 25
+    Steer = 26
+    TurboBoost = 27
+    Velocity = 28
+    WheelAngularSpeed = 29
+    AccG = 30
+
+
+class GL:
+    Lines = 0
+    LineStrip = 1
+    Triangles = 2
+    Quads = 3
+
+
+class FakeSim:
+    """Telemetry state shared by the fake ac module and the file backed shared memory"""
+
+    def __init__(self):
+        self.dir = tempfile.mkdtemp(prefix='fake_ac_')
+        self.focused_car = 0
+        self.steer_lock = 450.0
+        self.handbrake = 0.0
+        self.info = None
+
+    def open_mapping(self, size, tagname):
+        path = os.path.join(self.dir, tagname)
+        with open(path, 'wb') as f:
+            f.write(b'\0' * size)
+        f = open(path, 'r+b')
+        return _real_mmap(f.fileno(), size)
+
+    def step(self, gas=0.0, brake=0.0, clutch=1.0, steer=0.0, acc_g=(0.0, 0.0, 0.0), gear=2, speed_kmh=0.0, ffb=0.0):
+        """Advance one physics frame. `steer` is the normalized -1..1 input, like shared memory"""
+        physics = self.info.physics
+        physics.packetId += 1
+        physics.gas = gas
+        physics.brake = brake
+        physics.clutch = clutch
+        physics.steerAngle = steer
+        physics.accG[0], physics.accG[1], physics.accG[2] = acc_g
+        physics.gear = gear
+        physics.speedKmh = speed_kmh
+        physics.finalFF = ffb
+
+    def set_lap(self, lap=0, sector=0, lap_time=0, position=0.0):
+        """Lap progress as published in the graphics page"""
+        graphics = self.info.graphics
+        graphics.packetId += 1
+        graphics.completedLaps = lap
+        graphics.currentSectorIndex = sector
+        graphics.iCurrentTime = lap_time
+        graphics.normalizedCarPosition = position
+
+    def get_car_state(self, car_id, state, *args):
+        physics = self.info.physics
+        graphics = self.info.graphics
+        if state == CS.Gas: return physics.gas
+        if state == CS.Brake: return physics.brake
+        if state == CS.Clutch: return physics.clutch
+        if state == CS.Steer: return physics.steerAngle * self.steer_lock
+        if state == CS.AccG: return tuple(physics.accG)
+        if state == CS.Gear: return physics.gear
+        if state == CS.SpeedKMH: return physics.speedKmh
+        if state == CS.SpeedMPH: return physics.speedKmh / 1.609344
+        if state == CS.SpeedMS: return physics.speedKmh / 3.6
+        if state == CS.LastFF: return physics.finalFF
+        if state == CS.LapCount: return graphics.completedLaps
+        if state == CS.LapTime: return graphics.iCurrentTime
+        if state == CS.NormalizedSplinePosition: return graphics.normalizedCarPosition
+        return 0
+
+
+class GLStats:
+    """
+    Tracks draw state of the fake ac module.
+    `counts` holds draw calls, render target binds and estimated pixels touched;
+    offscreen pixels (inside a bound render target) are also counted separately.
+    """
+
+    def __init__(self, new_id):
+        self._new_id = new_id
+        self.targets = {}
+        self.bound = []
+        self.mode = None
+        self.vertices = []
+        self.counts = collections.Counter()
+
+    def _bounds(self):
+        return self.targets.get(self.bound[-1]) if self.bound else None
+
+    def _touch(self, pixels):
+        pixels = max(0, int(pixels))
+        self.counts['pixels'] += pixels
+        if self.bound:
+            self.counts['target_pixels'] += pixels
+
+    def _rect(self, x1, y1, x2, y2):
+        bounds = self._bounds()
+        if bounds:
+            x1, x2 = max(0, min(x1, x2)), min(bounds[0], max(x1, x2))
+            y1, y2 = max(0, min(y1, y2)), min(bounds[1], max(y1, y2))
+        return max(0, abs(x2 - x1)) * max(0, abs(y2 - y1))
+
+    def create_target(self, width, height, *args):
+        target = self._new_id()
+        self.targets[target] = (width, height)
+        return target
+
+    def dispose_target(self, target):
+        self.targets.pop(target, None)
+
+    def bind(self, target):
+        self.counts['binds'] += 1
+        self.bound.append(target)
+
+    def restore(self):
+        if self.bound:
+            self.bound.pop()
+
+    def clear(self, target):
+        self.counts['clears'] += 1
+        width, height = self.targets.get(target, (0, 0))
+        self._touch(width * height)
+
+    def generate_mips(self, target):
+        self.counts['mips'] += 1
+        width, height = self.targets.get(target, (0, 0))
+        self._touch(width * height)
+
+    def begin(self, mode):
+        self.counts['draw_calls'] += 1
+        self.mode = mode
+        self.vertices = []
+
+    def vertex(self, x, y, *args):
+        self.vertices.append((x, y))
+
+    def end(self):
+        v = self.vertices
+        if self.mode == GL.Quads:
+            for i in range(0, len(v) - 3, 4):
+                xs = [p[0] for p in v[i:i + 4]]
+                ys = [p[1] for p in v[i:i + 4]]
+                self._touch(self._rect(min(xs), min(ys), max(xs), max(ys)))
+        elif self.mode == GL.Lines:
+            for (x1, y1), (x2, y2) in zip(v[0::2], v[1::2]):
+                self._touch(max(abs(x2 - x1), abs(y2 - y1)) + 1)
+        self.vertices = []
+
+    def quad(self, x, y, width, height, *args):
+        self.counts['draw_calls'] += 1
+        self._touch(self._rect(x, y, x + width, y + height))
+
+
+class FakeAC(types.ModuleType):
+    """
+    Module object standing in for `ac`. Every call is counted in `calls`.
+    Unknown functions are accepted and return 0, `ext_` functions only exist when `csp` is set.
+    """
+
+    def __init__(self, sim, csp=True):
+        super().__init__('ac')
+        self._sim = sim
+        self._csp = csp
+        self._next_id = 1
+        self.calls = collections.Counter()
+        self.gl = GLStats(self._new_id)
+        self.log_lines = []
+
+    def _new_id(self, *args):
+        self._next_id += 1
+        return self._next_id
+
+    def _impl(self, name):
+        if name == 'getCarState': return self._sim.get_car_state
+        if name == 'getFocusedCar': return lambda *args: self._sim.focused_car
+        if name == 'ext_getHandbrake': return lambda *args: self._sim.handbrake
+        if name in ('newApp', 'addLabel', 'addButton', 'addCheckBox', 'addSpinner', 'addGraph',
+                    'newTexture', 'ext_glFontCreate'):
+            return self._new_id
+        if name == 'ext_createRenderTarget': return self.gl.create_target
+        if name == 'ext_disposeRenderTarget': return self.gl.dispose_target
+        if name == 'ext_bindRenderTarget': return self.gl.bind
+        if name == 'ext_restoreRenderTarget': return self.gl.restore
+        if name == 'ext_clearRenderTarget': return self.gl.clear
+        if name == 'ext_generateMips': return self.gl.generate_mips
+        if name == 'glBegin': return self.gl.begin
+        if name == 'glEnd': return self.gl.end
+        if name in ('glVertex2f', 'ext_glVertexTex'): return self.gl.vertex
+        if name in ('glQuad', 'glQuadTextured'): return self.gl.quad
+        if name in ('console', 'log'): return lambda *args: self.log_lines.append(' '.join(str(a) for a in args))
+        return lambda *args, **kwargs: 0
+
+    def __getattr__(self, name):
+        if name.startswith('_') or (name.startswith('ext_') and not self._csp):
+            raise AttributeError(name)
+
+        impl = self._impl(name)
+        calls = self.calls
+
+        def call(*args, **kwargs):
+            calls[name] += 1
+            return impl(*args, **kwargs)
+
+        setattr(self, name, call)
+        return call
+
+    def reset_calls(self):
+        self.calls.clear()
+        self.gl.counts.clear()
+
+    def total_calls(self):
+        return sum(self.calls.values())
+
+
+def _load_sim_info(sim):
+    """Import lib/sim_info.py with its named mappings redirected to files"""
+    mmap.mmap = lambda fileno, size, tagname=None, *args: sim.open_mapping(size, tagname)
+    try:
+        from _telemetry_overlay.lib import sim_info
+    finally:
+        mmap.mmap = _real_mmap
+
+    # the structures keep the mmaps exported until exit, closing them there only raises BufferError
+    sim_info.SimInfo.__del__ = lambda self: None
+    sim.info = sim_info.info
+    sim.info.graphics.replayTimeMultiplier = 1.0
+    return sim_info
+
+
+def install(csp=True, config_dir=None):
+    """
+    Register the fake modules and import the app package.
+    Returns (ac, sim). The app config and recordings are written to `config_dir` (a temp dir by default).
+    """
+    for name in list(sys.modules):
+        if name == 'telemetry_overlay' or name.startswith('_telemetry_overlay'):
+            del sys.modules[name]
+
+    sim = FakeSim()
+    ac = FakeAC(sim, csp)
+    acsys = types.ModuleType('acsys')
+    acsys.CS = CS
+    acsys.GL = GL
+    sys.modules['ac'] = ac
+    sys.modules['acsys'] = acsys
+
+    root = os.path.abspath(APP_ROOT)
+    if root not in sys.path:
+        sys.path.insert(0, root)
+
+    _load_sim_info(sim)
+
+    import telemetry_overlay
+    from _telemetry_overlay import config
+    config.config_path = os.path.join(config_dir or sim.dir, 'config.ini')
+    telemetry_overlay.config_path = config.config_path
+    telemetry_overlay.recordings_path = os.path.join(config_dir or sim.dir, 'recordings')
+
+    return ac, sim
@@ -0,0 +1,191 @@
+"""
+Headless replay of the overlay, no game required.
+
+Loads the app through the fake ac module, then drives acUpdate and the render callback
+frame by frame from a synthetic lap or a recording made with the in-game recorder.
+Reports python time per frame for update and render, and the ac calls per frame.
+
+usage:
+    python bench/replay.py [--source synthetic|<recording.tovr>] [--frames N] [--fps N]
+                           [--speed X] [--vanilla] [--set option=value ...]
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_ac
+
+
+def synthetic_stream(lap_seconds=90.0):
+    """Endless laps of made up but plausible inputs, as a function of session time"""
+    def sample(t):
+        lap, lap_t = divmod(t, lap_seconds)
+        phase = lap_t / lap_seconds * math.pi * 2 * 8
+        throttle = max(0.0, math.sin(phase))
+        brake = max(0.0, -math.sin(phase)) ** 2
+        return {
+            'gas': throttle,
+            'brake': brake,
+            'clutch': 1.0,
+            'steer': math.sin(phase / 2) * 0.4,
+            'acc_g': (math.sin(phase / 2) * 2.0, 0.0, (throttle - brake) * 1.2),
+            'gear': 2 + int(throttle * 4),
+            'speed_kmh': 80 + 140 * (0.5 + 0.5 * math.sin(phase - 1)),
+            'ffb': abs(math.sin(phase / 2)) * 0.8,
+            'lap': int(lap),
+            'sector': int(lap_t / lap_seconds * 3),
+            'lap_time': int(lap_t * 1000),
+            'position': lap_t / lap_seconds,
+        }
+    return sample
+
+
+def recording_stream(path):
+    """Replay a recording, mapping the recorded channels back onto sim inputs"""
+    from _telemetry_overlay.recorder import Recording
+
+    recording = Recording(path)
+    rows = [recording.column(name) for name in recording.columns]
+    rows = list(zip(*rows))
+    if not rows:
+        raise SystemExit('recording is empty: ' + path)
+
+    columns = recording.columns
+    start = rows[0][0]
+    duration = rows[-1][0] - start
+
+    def get(row, name, default=0.0):
+        return row[columns.index(name)] if name in columns else default
+
+    def sample(t):
+        # recordings are sampled at the overlay sample rate, pick the row at or before t
+        t = start + (t % duration if duration else 0)
+        lo, hi = 0, len(rows) - 1
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if rows[mid][0] <= t:
+                lo = mid
+            else:
+                hi = mid - 1
+        row = rows[lo]
+        return {
+            'gas': get(row, 'throttle'),
+            'brake': get(row, 'brake'),
+            'clutch': 1 - get(row, 'clutch'),
+            'steer': (0.5 - get(row, 'steering', 0.5)) * 2,
+            'acc_g': (0.0, 0.0, 0.0),
+            'gear': 3,
+            'speed_kmh': 120.0,
+            'ffb': get(row, 'ffb'),
+            'lap': int(get(row, 'lap', 0)),
+            'sector': int(get(row, 'sector', 0)),
+            'lap_time': int(get(row, 'lap_time', 0)),
+            'position': get(row, 'position'),
+        }
+    return sample
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def parse_value(value):
+    if value.lower() in ('true', 'false'):
+        return value.lower() == 'true'
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+class Replay:
+    """Runs the app entry points of telemetry_overlay.py against a telemetry stream"""
+
+    def __init__(self, csp=True, options=None):
+        self.ac, self.sim = fake_ac.install(csp=csp)
+        import telemetry_overlay
+        self.main = telemetry_overlay
+        self.main.acMain(1)
+        self.app = self.main.app_state
+
+        if options:
+            for key, value in options.items():
+                setattr(self.app.config, key, value)
+            self.app.apply_config()
+
+    def run(self, stream, frames, fps=60.0, speed=1.0):
+        """Play `frames` frames at `fps`, advancing the stream `speed` times faster than real time"""
+        dt = 1 / fps
+        update_times = []
+        render_times = []
+        calls = []
+        sim_time = 0.0
+
+        for _ in range(frames):
+            sim_time += dt * speed
+            state = stream(sim_time)
+            self.sim.set_lap(state.pop('lap'), state.pop('sector'), state.pop('lap_time'), state.pop('position'))
+            self.sim.step(**state)
+
+            self.ac.reset_calls()
+            start = time.perf_counter()
+            self.main.acUpdate(dt)
+            updated = time.perf_counter()
+            self.main.on_app_render(dt)
+            rendered = time.perf_counter()
+
+            update_times.append(updated - start)
+            render_times.append(rendered - updated)
+            calls.append(self.ac.total_calls())
+
+        return {
+            'update': update_times,
+            'render': render_times,
+            'calls': calls,
+        }
+
+    def shutdown(self):
+        self.main.acShutDown()
+
+
+def report(result):
+    print('{:<8} {:>10} {:>10} {:>10} {:>10}'.format('', 'mean us', 'p50 us', 'p99 us', 'max us'))
+    for name in ['update', 'render']:
+        values = [v * 1e6 for v in result[name]]
+        print('{:<8} {:>10.1f} {:>10.1f} {:>10.1f} {:>10.1f}'.format(
+            name, sum(values) / len(values), percentile(values, 0.5), percentile(values, 0.99), max(values)))
+    calls = result['calls']
+    print('ac calls per frame: mean {:.1f}, max {}'.format(sum(calls) / len(calls), max(calls)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--source', default='synthetic')
+    parser.add_argument('--frames', type=int, default=3600)
+    parser.add_argument('--fps', type=float, default=60)
+    parser.add_argument('--speed', type=float, default=1.0)
+    parser.add_argument('--vanilla', action='store_true', help='run without CSP extensions')
+    parser.add_argument('--set', action='append', default=[], metavar='OPTION=VALUE', help='override a config option')
+    args = parser.parse_args()
+
+    options = {}
+    for item in args.set:
+        key, _, value = item.partition('=')
+        options[key] = parse_value(value)
+
+    replay = Replay(csp=not args.vanilla, options=options)
+    stream = synthetic_stream() if args.source == 'synthetic' else recording_stream(args.source)
+    result = replay.run(stream, args.frames, args.fps, args.speed)
+    replay.shutdown()
+    report(result)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,29 +1,68 @@
 import ac, acsys
 
-from _telemetry_overlay.config import Config
+import math
+import time
+
+from _telemetry_overlay.channels import ActiveChannel, CHANNELS
+from _telemetry_overlay.config import ALL, GRAPH, LAYOUT, PROFILER, SAMPLING, STATIC, TEXT, TRACES, Config
 from _telemetry_overlay.data import TelemetryData
-from _telemetry_overlay.utils import console, load_texture
-from _telemetry_overlay.widgets import ACGraph, CSPGraph, Pedals, Wheel
+from _telemetry_overlay.ghost import GHOST_CHANNELS, GhostLoader
+from _telemetry_overlay.profiler import Profiler
+from _telemetry_overlay.recorder import start_recorder
+from _telemetry_overlay.scheduler import RateScheduler
+from _telemetry_overlay.text import TextLayer
+from _telemetry_overlay.utils import DRAW_RENDER_TARGET_CALLS, console, console_exception, draw_render_target, load_texture
+from _telemetry_overlay.widgets import ACGraph, CSPGraph, LineGraph, Pedals, Wheel
+
+
+def interpolate_columns(values, columns):
+    """Split (prev, value, color) segments into `columns` evenly spaced segments, oldest first"""
+    result = []
+    for i in range(columns):
+        start = i / columns
+        end = (i + 1) / columns
+        result.append([
+            (prev + (value - prev) * start, prev + (value - prev) * end, color)
+            for (prev, value, color) in values
+        ])
+    return result
+
+
+# alpha multiplier of reference lap traces
+GHOST_OPACITY = 0.35
 
 
 class App:
     def __init__(self):
         self.IS_CSP = hasattr(ac, 'ext_createRenderTarget')
-        self.update_ref = {'timer': 0, 'timeout': 0}
-        self.update_low_freq_ref = {'timer': 0, 'timeout': 0.1} # update low priority data every 0.1s
-        self.ac_graph_traces = {
-            'throttle': None,
-            'brake': None,
-            'clutch': None,
-            'steering': None,
-            'gx': None,
-            'gz': None,
-            'ffb': None,
-        }
+        self.trace_scheduler = RateScheduler(1)
+        self.low_freq_scheduler = RateScheduler(10) # update low priority data every 0.1s
+        self.ac_graph_traces = {channel.name: None for channel in CHANNELS if not channel.csp_only}
+        self.active_channels = []
+        # reference lap traces, drawn below the live traces but not recorded
+        self.ghost_channels = []
+        self.graph_channels = []
+        self.ghost = None
+        self.ghost_tag = None
+        self.ghost_loader = None
+        self.recorder = None
+        self.profiler = Profiler()
+        self.profiler_scheduler = RateScheduler(2)
+        self.text_scheduler = RateScheduler(1)
+        # graph background, grid lines, label and wheel backdrop, redrawn only in apply_config
+        self.static_target = 0
+        self.static_size = (0, 0)
+        self.grid_lines = []
+        # set by apply_config
+        self.window_width = 0
+        self.window_height = 0
+        self.graph_origin_x = 0
+        self.graph_origin_y = 0
 
     def load_main(self):
         self.config = Config()
         self.telemetry = TelemetryData(self.IS_CSP, self.config)
+        console('telemetry buffers (bytes):', self.telemetry.memory_report())
 
         self.app_window = ac.newApp("Telemetry Overlay")
         ac.setTitle(self.app_window, "")
@@ -41,7 +80,16 @@ class App:
         self._on_toggle_settings = lambda *args: self.settings.set_open(True) if self.config.open_settings_click else None
         ac.addOnClickedListener(self.toggle_settings_button, self._on_toggle_settings)
 
+        # right side of the graph switches to the next profile
+        self.cycle_profile_button = ac.addButton(self.app_window, "")
+        ac.setBackgroundOpacity(self.cycle_profile_button, 0)
+        ac.drawBorder(self.cycle_profile_button, 0)
+        self._on_cycle_profile = lambda *args: self.cycle_profile() if self.config.cycle_profile_click else None
+        ac.addOnClickedListener(self.cycle_profile_button, self._on_cycle_profile)
+
         self.ac_graph = None
+        self.graph_bg_label = None
+        self.drawn_graph = False
         self.csp_graph = None
         if self.IS_CSP:
             self.csp_graph = CSPGraph(self.config.app_width, 0, 0, self.config.app_height, self.config.trace_size)
@@ -53,27 +101,108 @@ class App:
                 console('Falling back to traditional AC graph')
         
         if not self.IS_CSP:
-            self.ac_graph = ACGraph(
-                window=self.app_window,
-                y=0,
-                x=0,
-                width=self.config.app_width,
-                height=self.config.app_height,
-                trace_width=self.config.trace_size,
-                opacity=self.config.opacity
-            )
-            self.ac_graph.setup()
+            self.ac_graph = self.create_ac_graph()
 
         self.pedals = Pedals(self.app_window, self.IS_CSP, self.config, self.telemetry)
 
+        # labels are rendered into a texture on CSP, AC labels are used otherwise
+        self.text_layer = TextLayer() if self.IS_CSP else None
+
         self.wheel = Wheel(self.IS_CSP, self.config, self.telemetry)
 
         self.telemetry_label_texture = load_texture('img/telemetry-label.png')
         self.half_circle_texture = load_texture('img/half-circle.png')
 
+        self.profiler_label = ac.addLabel(self.app_window, '')
+        ac.setFontSize(self.profiler_label, 12)
+        ac.setCustomFont(self.profiler_label, 'Consolas', 0, 0)
+        self.profiler.add_target('on_update', self, 'on_update')
+        self.profiler.add_target('on_render', self, 'on_render')
+        self.profiler.add_target('update_telemetry', self.telemetry, 'update_telemetry')
+        if self.csp_graph:
+            self.profiler.add_target('graph.add_values', self.csp_graph, 'add_values')
+        self.profiler.add_target('pedals.render', self.pedals, 'render')
+        self.profiler.add_target('wheel.render', self.wheel, 'render')
+        self.profiler.add_target('config.save', self.config, 'save')
+
+        self.config.listeners.append(self.on_config_change)
         self.apply_config()
 
-    def apply_config(self):
+    def create_ac_graph(self):
+        """Graph used without CSP, AC graph widgets or traces drawn in the render callback"""
+        if self.config.drawn_graph:
+            return LineGraph(
+                x=0,
+                y=0,
+                width=self.config.app_width,
+                height=self.config.app_height,
+                trace_width=self.config.trace_size,
+            )
+
+        graph = ACGraph(
+            window=self.app_window,
+            y=0,
+            x=0,
+            width=self.config.app_width,
+            height=self.config.app_height,
+            trace_width=self.config.trace_size,
+            opacity=self.config.opacity,
+            bg_label=self.graph_bg_label,
+        )
+        # AC labels can not be removed, every ACGraph of the window shares one
+        self.graph_bg_label = graph.bg_label
+        graph.setup()
+        return graph
+
+    def on_config_change(self, option, changes):
+        if changes:
+            self.apply_config(changes)
+
+    def cycle_profile(self):
+        """Switch to the next profile, nothing to do with a single profile"""
+        if len(self.config.profiles) < 2:
+            return
+        self.config.switch_profile(self.config.next_profile())
+        console('profile:', self.config.profile)
+
+    def apply_config(self, changes=ALL):
+        """Rebuild the parts of the app in `changes`, a mask of the flags in config.py"""
+        if changes & LAYOUT:
+            geometry = (self.window_width, self.window_height, self.graph_origin_x, self.graph_origin_y)
+            self.update_layout()
+            # everything positioned in or sized to the window follows the layout
+            if geometry != (self.window_width, self.window_height, self.graph_origin_x, self.graph_origin_y):
+                changes |= GRAPH | STATIC | TEXT
+
+        if changes & PROFILER:
+            self.profiler.set_enabled(self.config.show_profiler)
+            ac.setVisible(self.profiler_label, int(self.config.show_profiler))
+            if not self.config.show_profiler:
+                ac.setText(self.profiler_label, '')
+
+        if changes & GRAPH:
+            self.update_graph()
+        elif changes & TRACES:
+            self.update_channels()
+
+        if changes & STATIC:
+            self.build_static_layer()
+
+        if changes & SAMPLING:
+            if self.text_scheduler.rate != self.config.text_refresh_rate:
+                self.text_scheduler.set_rate(self.config.text_refresh_rate)
+            if self.trace_scheduler.rate != self.config.sample_rate:
+                self.trace_scheduler.set_rate(self.config.sample_rate)
+                # catch up on at most a quarter second of samples, longer gaps are dropped
+                self.trace_scheduler.max_catch_up = max(1, self.config.sample_rate // 4)
+
+        if changes & TEXT:
+            if self.text_layer:
+                self.text_layer.setup(self.window_width, self.window_height)
+            self.update_text()
+
+    def update_layout(self):
+        """Window size and positions of the graph, pedal bars and wheel"""
         self.items_gap = 4 + round(self.config.padding / 4 + self.config.app_height / 40)
 
         self.window_height = self.config.app_height + self.config.padding * 2
@@ -115,8 +244,19 @@ class App:
 
         # left side of the main window is clickable for settings
         ac.setSize(self.toggle_settings_button, self.config.app_width / 2, self.config.app_height)
-
-        self.update_ref['timeout'] = 1 / self.config.sample_rate
+        ac.setPosition(self.cycle_profile_button, self.config.app_width / 2, 0)
+        ac.setSize(self.cycle_profile_button, self.config.app_width / 2, self.config.app_height)
+        ac.setPosition(self.profiler_label, self.graph_origin_x, self.window_height + 4)
+
+    def update_graph(self):
+        """Size and position the graph, the CSP render targets are only recreated on a size change"""
+        if not self.IS_CSP and isinstance(self.ac_graph, LineGraph) != self.config.drawn_graph:
+            # traces are added to the new graph below
+            self.ac_graph.dispose()
+            self.ac_graph = self.create_ac_graph()
+            for name in self.ac_graph_traces:
+                self.ac_graph_traces[name] = None
+        self.drawn_graph = isinstance(self.ac_graph, LineGraph)
 
         if self.IS_CSP:
             self.csp_graph.x = self.graph_origin_x
@@ -134,100 +274,257 @@ class App:
             self.ac_graph.opacity = self.config.opacity
             self.ac_graph.setup()
 
-            if self.config.show_ffb and not self.ac_graph_traces['ffb']:
-                self.ac_graph_traces['ffb'] = self.ac_graph.add_trace(self.config.ffb_color)
-            if self.config.show_gz and not self.ac_graph_traces['gz']:
-                self.ac_graph_traces['gz'] = self.ac_graph.add_trace(self.config.gz_color)
-            if self.config.show_gx and not self.ac_graph_traces['gx']:
-                self.ac_graph_traces['gx'] = self.ac_graph.add_trace(self.config.gx_color)
-            if self.config.show_steering and not self.ac_graph_traces['steering']:
-                self.ac_graph_traces['steering'] = self.ac_graph.add_trace(self.config.steering_color)
-            if self.config.show_clutch and not self.ac_graph_traces['clutch']:
-                self.ac_graph_traces['clutch'] = self.ac_graph.add_trace(self.config.clutch_color)
-            if self.config.show_throttle and not self.ac_graph_traces['throttle']:
-                self.ac_graph_traces['throttle'] = self.ac_graph.add_trace(self.config.throttle_color)
-            if self.config.show_brake and not self.ac_graph_traces['brake']:
-                self.ac_graph_traces['brake'] = self.ac_graph.add_trace(self.config.brake_color)
+        self.update_channels()
 
+    def update_channels(self):
+        """Add, remove and recolor the AC graph traces to match the config, then recompile the channels"""
+        if not self.IS_CSP:
+            # traces stay in channel registry order, which is also their draw order
+            index = 0
+            for channel in CHANNELS:
+                if channel.csp_only:
+                    continue
+
+                trace = self.ac_graph_traces[channel.name]
+                color = getattr(self.config, channel.color_key)
+                if not getattr(self.config, channel.show_key):
+                    if trace:
+                        trace.remove()
+                        self.ac_graph_traces[channel.name] = None
+                    continue
+
+                if trace:
+                    trace.update_color(color)
+                else:
+                    self.ac_graph_traces[channel.name] = self.ac_graph.add_trace(color, index)
+                index += 1
+
+        self.compile_channels()
+
+    def compile_channels(self):
+        """
+        Resolve the enabled channels with their color and AC graph trace,
+        so the sampling loop does not have to look at the config.
+        """
+        prev_values = {channel.name: channel.prev for channel in self.graph_channels}
+
+        self.active_channels = []
+        for channel in CHANNELS:
+            if channel.csp_only and not self.IS_CSP:
+                continue
+            if not getattr(self.config, channel.show_key):
+                continue
+
+            self.active_channels.append(ActiveChannel(
+                name=channel.name,
+                getter=channel.getter,
+                color=getattr(self.config, channel.color_key),
+                trace=None if self.IS_CSP else self.ac_graph_traces[channel.name],
+                prev=prev_values[channel.name] if channel.name in prev_values else channel.getter(self.telemetry),
+            ))
+
+        self.update_ghost()
+        self.ghost_channels = []
+        if self.ghost:
+            for name in GHOST_CHANNELS:
+                if name not in self.ghost.tables or not getattr(self.config, 'show_' + name):
+                    continue
+
+                color = getattr(self.config, name + '_color')
+                getter = self.ghost.getter(name)
+                self.ghost_channels.append(ActiveChannel(
+                    name='ghost_' + name,
+                    getter=getter,
+                    color=(color[0], color[1], color[2], color[3] * GHOST_OPACITY),
+                    prev=prev_values['ghost_' + name] if 'ghost_' + name in prev_values else getter(self.telemetry),
+                ))
+
+        self.graph_channels = self.ghost_channels + self.active_channels
+        if self.csp_graph:
+            self.csp_graph.set_channels(
+                [channel.name for channel in self.graph_channels],
+                [channel.color for channel in self.graph_channels],
+            )
 
-    def on_update(self, dt):
-        self.update_ref['timer'] += dt
-        self.update_low_freq_ref['timer'] += dt
+        self.update_recorder()
+
+    def update_ghost(self):
+        """
+        Start loading the reference lap for the current track and car when the ghost is enabled.
+        The lap is loaded in the background, check_ghost_loader adds its traces once it is ready.
+        """
+        if not self.IS_CSP or not self.config.show_ghost:
+            self.ghost = None
+            self.ghost_tag = None
+            self.ghost_loader = None
+            return
+
+        tag = self.telemetry.session_tag()
+        if tag != self.ghost_tag:
+            from telemetry_overlay import recordings_path
+            self.ghost = None
+            self.ghost_tag = tag
+            self.ghost_loader = GhostLoader(recordings_path, tag)
+
+    def check_ghost_loader(self):
+        """Take the reference lap once the loader finished, ignoring loads for an outdated tag"""
+        loader = self.ghost_loader
+        if not loader or not loader.done:
+            return
+
+        self.ghost_loader = None
+        if loader.tag == self.ghost_tag and loader.ghost:
+            self.ghost = loader.ghost
+            self.compile_channels()
+
+    def update_recorder(self):
+        """Start, stop or restart the recorder to match the config and the enabled channels"""
+        channels = [channel.name for channel in self.active_channels]
+        if self.recorder and (not self.config.record_telemetry or self.recorder.channels != channels):
+            self.recorder.close()
+            self.recorder = None
+
+        if self.config.record_telemetry and not self.recorder:
+            from telemetry_overlay import recordings_path
+            self.recorder = start_recorder(recordings_path, time.time(), channels, self.telemetry.session_tag())
 
+    def on_update(self, dt):
         # update telemetry
-        if self.update_ref['timer'] >= self.update_ref['timeout'] and self.telemetry.replay_time_multiplier != 0:
-            prev_throttle = self.telemetry.throttle
-            prev_brake = self.telemetry.brake
-            prev_clutch = self.telemetry.clutch
-            prev_steering_norm = self.telemetry.steering_norm
-            prev_gx = self.telemetry.get_gx()
-            prev_gz = self.telemetry.get_gz()
-            prev_ffb = self.telemetry.ffb
-            prev_handbrake = self.telemetry.handbrake
-
-            self.update_ref['timer'] = 0
-            self.telemetry.update_telemetry()
-
-            self.pedals.update()
-
-            if self.IS_CSP:
-                values = []
-                if self.config.show_ffb:
-                    values.append((prev_ffb, self.telemetry.ffb, self.config.ffb_color))
-                if self.config.show_gz:
-                    values.append((prev_gz, self.telemetry.get_gz(), self.config.gz_color))
-                if self.config.show_gx:
-                    values.append((prev_gx, self.telemetry.get_gx(), self.config.gx_color))
-                if self.config.show_steering:
-                    values.append((prev_steering_norm, self.telemetry.steering_norm, self.config.steering_color))
-                if self.config.show_handbrake:
-                    values.append((prev_handbrake, self.telemetry.handbrake, self.config.handbrake_color))
-                if self.config.show_clutch:
-                    values.append((prev_clutch, self.telemetry.clutch, self.config.clutch_color))
-                if self.config.show_throttle:
-                    values.append((prev_throttle, self.telemetry.throttle, self.config.throttle_color))
-                if self.config.show_brake:
-                    values.append((prev_brake, self.telemetry.brake, self.config.brake_color))
-                
-                self.csp_graph.add_values(values)
-            else:
-                if self.ac_graph_traces['brake']:
-                    self.ac_graph_traces['brake'].add_value(self.telemetry.brake)
-                if self.ac_graph_traces['throttle']:
-                    self.ac_graph_traces['throttle'].add_value(self.telemetry.throttle)
-                if self.ac_graph_traces['clutch']:
-                    self.ac_graph_traces['clutch'].add_value(self.telemetry.clutch)
-                if self.ac_graph_traces['steering']:
-                    self.ac_graph_traces['steering'].add_value(self.telemetry.steering_norm)
-                if self.ac_graph_traces['gz']:
-                    self.ac_graph_traces['gz'].add_value(self.telemetry.get_gz())
-                if self.ac_graph_traces['gx']:
-                    self.ac_graph_traces['gx'].add_value(self.telemetry.get_gx())
-                if self.ac_graph_traces['ffb']:
-                    self.ac_graph_traces['ffb'].add_value(self.telemetry.ffb)
+        # one graph column per elapsed sample period, so slow frames don't stretch the time axis
+        columns = self.trace_scheduler.advance(dt)
+        if columns and self.telemetry.replay_time_multiplier != 0:
+            # nothing new to draw when the physics frame has not advanced
+            if self.telemetry.frame_advanced():
+                self.sample(columns)
         
         # low priorty updates
         # low frequency to reduce load
-        if self.update_low_freq_ref['timer'] >= self.update_low_freq_ref['timeout']:
-            self.update_low_freq_ref['timer'] = 0
+        if self.low_freq_scheduler.advance(dt):
             self.telemetry.update_globals()
 
             # Window opacity is reset on drag, set to correct value
             ac.setBackgroundOpacity(self.app_window, self.config.opacity)
 
-            if self.config.update_cfg:
-                self.config.update_cfg = False
-                self.config.save()
+            # written once the settings have not changed for a moment
+            self.config.save_changes()
+
+            self.check_ghost_loader()
+
+            # traces removed or recolored since the last tick, rebuild the AC graph once
+            if self.ac_graph and not self.drawn_graph and self.ac_graph.dirty:
+                self.ac_graph.setup()
+
+        # labels change at most at the text refresh rate, independent of the frame rate
+        if self.text_scheduler.advance(dt):
+            self.update_text()
+
+        if self.profiler.enabled and self.profiler_scheduler.advance(dt):
+            ac.setText(self.profiler_label, self.profiler.report())
+
+    def sample(self, columns=1):
+        """
+        Sample telemetry and push the new values to the graph.
+        When several sample periods passed since the last sample, `columns` values are
+        interpolated between the previous and the new sample to keep the time axis correct.
+        """
+        telemetry = self.telemetry
+        telemetry.update_telemetry()
+
+        values = []
+        for channel in self.graph_channels:
+            value = channel.getter(telemetry)
+            values.append((channel.prev, value, channel.color))
+            channel.prev = value
+
+        if self.recorder:
+            self.recorder.record(
+                time.time(),
+                telemetry.sampled_packet_id,
+                telemetry.lap,
+                telemetry.sector,
+                telemetry.lap_time,
+                telemetry.position,
+                [value for (_, value, _) in values[len(self.ghost_channels):]]
+            )
 
-    def on_render(self, dt):
-        self.pedals.render()
+        if self.IS_CSP:
+            if columns == 1:
+                self.csp_graph.add_values(values)
+            else:
+                self.csp_graph.add_columns(interpolate_columns(values, columns))
+        else:
+            for channel, (prev, value, _) in zip(self.active_channels, values):
+                if columns == 1:
+                    channel.trace.add_value(value)
+                else:
+                    for i in range(1, columns + 1):
+                        channel.trace.add_value(prev + (value - prev) * i / columns)
+
+    def update_text(self):
+        """Refresh pedal and wheel labels, the CSP text layer is only redrawn when a label changed"""
+        labels = self.pedals.update_text() + self.wheel.update_text()
+        if self.text_layer:
+            self.text_layer.update(labels)
+
+    def build_static_layer(self):
+        """
+        Parts of the app that only change in apply_config are drawn into a CSP render target
+        once, every frame then draws them as a single textured quad.
+        When they take fewer ac calls than drawing the target, e.g. only the graph background,
+        they are drawn directly instead.
+        """
+        self.grid_lines = []
+        if self.config.show_graph_lines:
+            for offset in [0.25, 0.5, 0.75]:
+                y = self.config.app_height * offset + self.graph_origin_y
+                self.grid_lines.append((self.graph_origin_x, y))
+                self.grid_lines.append((self.config.app_width + self.graph_origin_x, y))
+
+        if not self.IS_CSP or self.static_calls() <= DRAW_RENDER_TARGET_CALLS:
+            if self.static_target:
+                ac.ext_disposeRenderTarget(self.static_target)
+                self.static_target = 0
+            return
+
+        size = (int(math.ceil(self.window_width)), int(math.ceil(self.window_height)))
+        try:
+            if self.static_target and size != self.static_size:
+                ac.ext_disposeRenderTarget(self.static_target)
+                self.static_target = 0
+            if not self.static_target:
+                self.static_target = ac.ext_createRenderTarget(size[0], size[1], False)
+                self.static_size = size
+        except Exception as e:
+            console_exception(e, 'Failed to create CSP static layer, drawing it every frame')
+            self.static_target = 0
+            return
+
+        ac.ext_clearRenderTarget(self.static_target)
+        ac.ext_bindRenderTarget(self.static_target)
+        # write colors and alpha as they are, the layer is blended with the game when drawn
+        ac.ext_glSetBlendMode(0)
+        self.draw_static()
+        ac.ext_restoreRenderTarget()
+
+    def static_calls(self):
+        """ac calls made by draw_static with the current config"""
+        calls = 0
+        if self.config.show_wheel:
+            calls += 2
+        if self.IS_CSP or self.drawn_graph:
+            calls += 2
+        if self.config.show_telemetry_label and self.telemetry_label_texture:
+            calls += 2
+        if self.grid_lines:
+            calls += 3 + len(self.grid_lines)
+        return calls
 
+    def draw_static(self):
         if self.config.show_wheel:
             ac.glColor4f(0, 0, 0, self.config.opacity)
             ac.glQuadTextured(self.base_wheel_texture, 0, self.window_height / 2, self.window_height, self.half_circle_texture)
-            self.wheel.render()
 
-        if self.IS_CSP:
+        if self.IS_CSP or self.drawn_graph:
             ac.glColor4f(0.24, 0.24, 0.24, self.config.opacity)
             ac.glQuad(self.graph_origin_x, self.graph_origin_y, self.config.app_width, self.config.app_height)
 
@@ -235,17 +532,32 @@ class App:
             ac.glColor4f(1, 1, 1, 1)
             ac.glQuadTextured(0, 0, self.label_width, self.window_height, self.telemetry_label_texture)
 
-        if self.config.show_graph_lines:
-            for offset in [0.25, 0.5, 0.75]:
-                y = self.config.app_height * offset + self.graph_origin_y
-                ac.glBegin(acsys.GL.Lines)
-                ac.glColor4f(0.42, 0.42, 0.42, min(0.3 + self.config.opacity, 1))
-                ac.glVertex2f(self.graph_origin_x, y)
-                ac.glVertex2f(self.config.app_width + self.graph_origin_x, y)
-                ac.glEnd()
+        if self.grid_lines:
+            ac.glBegin(acsys.GL.Lines)
+            ac.glColor4f(0.42, 0.42, 0.42, min(0.3 + self.config.opacity, 1))
+            for x, y in self.grid_lines:
+                ac.glVertex2f(x, y)
+            ac.glEnd()
+
+    def on_render(self, dt):
+        # static parts first, everything else is drawn on top of them
+        if self.static_target:
+            draw_render_target(self.static_target, 0, 0, self.static_size[0], self.static_size[1])
+        else:
+            self.draw_static()
+
+        self.pedals.render()
+
+        if self.config.show_wheel:
+            self.wheel.render()
+
+        if self.text_layer:
+            self.text_layer.render()
     
         if self.csp_graph:
             self.csp_graph.render()
+        elif self.drawn_graph:
+            self.ac_graph.render()
         
         # Window opacity is reset on drag, set to correct value
         if self.settings.open:
@@ -0,0 +1,80 @@
+import sys
+from array import array
+
+
+class RingSmoother:
+    """
+    Moving average over the last `size` samples.
+    Samples live in a preallocated float array with a running sum, so push and mean are O(1).
+    """
+    __slots__ = ('size', 'values', 'head', 'count', 'total')
+
+    def __init__(self, size=1):
+        self.size = 0
+        self.values = array('f')
+        self.head = 0
+        self.count = 0
+        self.total = 0.0
+        self.resize(size)
+
+    def resize(self, size):
+        """Change capacity, keeping the most recent samples that still fit"""
+        size = max(1, int(size))
+        if size == self.size:
+            return
+
+        kept = self.latest(min(self.count, size))
+
+        self.size = size
+        self.values = array('f', [0.0]) * size
+        self.head = 0
+        self.count = 0
+        self.total = 0.0
+        for value in kept:
+            self.push(value)
+
+    def push(self, value):
+        values = self.values
+        head = self.head
+
+        if self.count == self.size:
+            self.total += value - values[head]
+        else:
+            self.count += 1
+            self.total += value
+
+        values[head] = value
+
+        head += 1
+        if head == self.size:
+            head = 0
+            # recompute once per wrap to stop floating point drift of the running sum
+            self.total = sum(values)
+        self.head = head
+
+    def mean(self, default=0.0):
+        if not self.count:
+            return default
+
+        return self.total / self.count
+
+    def latest(self, n):
+        """Return the last `n` samples, oldest first"""
+        n = min(n, self.count)
+        if n <= 0:
+            return []
+
+        start = (self.head - n) % self.size
+        if start + n <= self.size:
+            return self.values[start:start + n].tolist()
+
+        return self.values[start:].tolist() + self.values[:self.head].tolist()
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+        self.total = 0.0
+
+    def nbytes(self):
+        """Bytes held by this buffer, including the sample array"""
+        return sys.getsizeof(self) + sys.getsizeof(self.values)
@@ -0,0 +1,50 @@
+from operator import attrgetter
+
+from _telemetry_overlay.data import TelemetryData
+
+
+class Channel:
+    """
+    Graph channel definition.
+    Visibility and color are read from the `show_<name>` and `<name>_color` config options.
+    """
+    __slots__ = ('name', 'getter', 'show_key', 'color_key', 'csp_only')
+
+    def __init__(self, name, getter, csp_only=False):
+        self.name = name
+        self.getter = getter
+        self.show_key = 'show_' + name
+        self.color_key = name + '_color'
+        self.csp_only = csp_only
+
+
+class ActiveChannel:
+    """Enabled channel with everything the sampling loop needs resolved up front"""
+    __slots__ = ('name', 'getter', 'color', 'trace', 'prev')
+
+    def __init__(self, name, getter, color, trace=None, prev=0):
+        self.name = name
+        self.getter = getter
+        self.color = color
+        self.trace = trace
+        self.prev = prev
+
+
+# in draw order, later channels are drawn on top
+CHANNELS = []
+
+
+def register_channel(name, getter, csp_only=False):
+    channel = Channel(name, getter, csp_only)
+    CHANNELS.append(channel)
+    return channel
+
+
+register_channel('ffb', attrgetter('ffb'))
+register_channel('gz', TelemetryData.get_gz)
+register_channel('gx', TelemetryData.get_gx)
+register_channel('steering', attrgetter('steering_norm'))
+register_channel('handbrake', attrgetter('handbrake'), csp_only=True)
+register_channel('clutch', attrgetter('clutch'))
+register_channel('throttle', attrgetter('throttle'))
+register_channel('brake', attrgetter('brake'))
@@ -1,66 +1,251 @@
 import configparser
+import io
+import math
+import os
+import threading
+import time
 
 from telemetry_overlay import config_path
-from _telemetry_overlay.utils import console
+from _telemetry_overlay.utils import console, console_exception, write_atomic
+
+# seconds without changes before changed options are written
+SAVE_DELAY = 1.0
+
+BOOLEAN_STATES = configparser.ConfigParser.BOOLEAN_STATES
+
+
+def parse_bool(text):
+    return BOOLEAN_STATES[text.lower()]
+
+
+def parse_int(text):
+    try:
+        return int(text)
+    except ValueError:
+        return int(float(text))
+
+
+# rgba value are represented as four 0-100 int values saperated by a ","
+def parse_rgba(text):
+    r, g, b, a = [int(s) / 100 for s in text.split(',')]
+    return (r, g, b, a)
+
+
+def serialize_rgba(value):
+    return ','.join([str(int(round(i * 100))) for i in value])
+
+
+# Parts of the app an option invalidates when it changes, App.apply_config only rebuilds these.
+# window size and positions, pedal bar and wheel geometry
+LAYOUT = 1
+# graph render targets or AC graph widgets
+GRAPH = 2
+# value labels and the CSP text layer
+TEXT = 4
+# background, grid lines, telemetry label and wheel backdrop
+STATIC = 8
+# trace sample rate and label refresh rate
+SAMPLING = 16
+PROFILER = 32
+# enabled graph traces, their colors and the recorder
+TRACES = 64
+ALL = LAYOUT | GRAPH | TEXT | STATIC | SAMPLING | PROFILER | TRACES
+
+# profile stored in the GENERAL section, config files without profiles only have this one
+DEFAULT_PROFILE = 'default'
+# other profiles are stored in "PROFILE <name>" sections and only hold the options they override
+PROFILE_PREFIX = 'PROFILE '
+# section with the name of the active profile
+PROFILES_SECTION = 'PROFILES'
+
+# parse and serialize functions per field type
+CODECS = {
+    'bool': (parse_bool, str),
+    'int': (parse_int, str),
+    'float': (float, str),
+    'rgba': (parse_rgba, serialize_rgba),
+}
+
+
+class Field:
+    """
+    A config option: name, type, default, for numbers the allowed range and the parts of the app
+    a change invalidates. Options read live every frame invalidate nothing.
+    """
+    __slots__ = ('name', 'type', 'default', 'min', 'max', 'invalidates', 'parse', 'serialize')
+
+    def __init__(self, name, type, default, min=None, max=None, invalidates=0):
+        self.name = name
+        self.type = type
+        self.default = default
+        self.min = min
+        self.max = max
+        self.invalidates = invalidates
+        self.parse, self.serialize = CODECS[type]
+
+    def validate(self, value):
+        """`value` clamped to the range of the field, ValueError for nan and infinite floats"""
+        if self.type == 'rgba':
+            return tuple([min(max(i, 0.0), 1.0) for i in value])
+        # nan passes every range check, comparisons with it are always False
+        if self.type == 'float' and not math.isfinite(value):
+            raise ValueError('{} must be a finite number, got {}'.format(self.name, value))
+        if self.min is not None and value < self.min:
+            return self.min
+        if self.max is not None and value > self.max:
+            return self.max
+        return value
+
+
+# every option of the app, in the order they are written to config.ini
+FIELDS = (
+    Field('show_throttle', 'bool', True, invalidates=TRACES),   # Show throttle trace
+    Field('show_brake', 'bool', True, invalidates=TRACES),  # Show brake trace
+    Field('show_clutch', 'bool', False, invalidates=TRACES),    # Show clutch trace
+    Field('show_steering', 'bool', False, invalidates=TRACES),  # Show steering trace
+    Field('show_handbrake', 'bool', False, invalidates=TRACES), # Show handbrake trace
+    Field('show_gx', 'bool', False, invalidates=TRACES),    # Show lageral g force trace
+    Field('show_gz', 'bool', False, invalidates=TRACES),    # Show longitudinal g force trace
+    Field('show_ffb', 'bool', False, invalidates=TRACES),   # Show force feedback trace
+    Field('show_ghost', 'bool', False, invalidates=TRACES), # Show throttle and brake of the best recorded lap as translucent traces
+    Field('show_throttle_bar', 'bool', False, invalidates=LAYOUT),  # Show throttle bar
+    Field('show_brake_bar', 'bool', False, invalidates=LAYOUT), # Show brake bar
+    Field('show_clutch_bar', 'bool', False, invalidates=LAYOUT),    # Show clutch bar
+    Field('show_handbrake_bar', 'bool', False, invalidates=LAYOUT), # Show handbrake bar
+    Field('show_ffb_bar', 'bool', False, invalidates=LAYOUT),   # Show force feedback bar
+    Field('show_bar_value', 'bool', False, invalidates=LAYOUT | TEXT), # Show number value above bar
+    Field('show_graph_lines', 'bool', False, invalidates=STATIC),   # Show horizontal graph lines
+    Field('show_telemetry_label', 'bool', False, invalidates=LAYOUT | STATIC),   # Show temetry label
+    Field('show_wheel', 'bool', False, invalidates=LAYOUT), # Show wheel circle
+    Field('open_settings_click', 'bool', True), # Open settings window on clicking left side of the main window
+    Field('cycle_profile_click', 'bool', False), # Switch to the next profile on clicking right side of the graph
+    Field('metric', 'bool', True, invalidates=TEXT),  # Use metric values
+    Field('wheel_show_gear', 'bool', True, invalidates=LAYOUT | TEXT), # Show gear label in wheel
+    Field('wheel_show_speed', 'bool', True, invalidates=LAYOUT | TEXT),    # Show speed label in wheel
+    Field('wheel_show_delta', 'bool', False, invalidates=TEXT),   # Show delta to the session best lap in place of the speed unit
+    Field('pedals_end_stop', 'bool', True, invalidates=LAYOUT), # Pedal end stop indicator
+    Field('pedals_base_stop', 'bool', False, invalidates=LAYOUT),   # Pedal base stop indicator
+    Field('ffb_flash_on_clip', 'bool', True),   # Flash force feedback bar red when clipping
+    Field('use_shared_memory', 'bool', False),  # Read player car telemetry directly from shared memory
+    Field('record_telemetry', 'bool', False, invalidates=TRACES),   # Record sampled telemetry to the recordings folder
+    Field('drawn_graph', 'bool', False, invalidates=GRAPH | STATIC),    # Without CSP, draw traces in the render callback instead of using AC graphs
+    Field('show_profiler', 'bool', False, invalidates=PROFILER),  # Time the hot paths of the app and show the results below it
+    Field('app_height', 'int', 100, 10, 1000, invalidates=LAYOUT),  # App height in pixels
+    Field('app_width', 'int', 300, 10, 1000, invalidates=LAYOUT),   # App width in pixels
+    Field('sample_rate', 'int', 40, 1, 100, invalidates=SAMPLING),    # Traces sample rate in hz
+    Field('text_refresh_rate', 'int', 10, 1, 60, invalidates=SAMPLING),   # Refresh rate of value labels in hz
+    Field('trace_size', 'int', 2, 1, 10, invalidates=GRAPH),   # Trace line thickness in px
+    Field('opacity', 'float', 0.5, 0.0, 1.0, invalidates=GRAPH | STATIC),   # App opacity
+    Field('denoise_g', 'int', 5, 1, 50),    # Number of measurements to combine to denoise g force traces
+    Field('padding', 'int', 0, 0, 30, invalidates=LAYOUT),  # Padding around main window
+    Field('bar_width', 'int', 10, 1, 50, invalidates=LAYOUT | TEXT),   # Width of bars
+    Field('steering_sensitivity', 'int', 720, 100, 1000),   # Max value for steering in graph
+    Field('wheel_depth', 'int', 8, 1, 30, invalidates=LAYOUT | TEXT),  # Thickness of the wheel
+    Field('wheel_angle', 'int', 15, 1, 40, invalidates=LAYOUT), # Width of the wheel
+    Field('throttle_color', 'rgba', (0.16, 1.0, 0.0, 1.0), invalidates=TRACES), # Color of the throttle trace
+    Field('brake_color', 'rgba', (1.0, 0.16, 0.0, 1.0), invalidates=TRACES),    # Color of the brake trace
+    Field('clutch_color', 'rgba', (0.16, 1.0, 1.0, 1.0), invalidates=TRACES),   # Color of the clutch trace
+    Field('steering_color', 'rgba', (0.9, 0.9, 0.9, 1.0), invalidates=TRACES),  # Color of the steering trace
+    Field('handbrake_color', 'rgba', (0.0, 0.16, 1.0, 1.0), invalidates=TRACES),    # Color of the handbrake trace
+    Field('gx_color', 'rgba', (1.0, 0.9, 0.0, 1.0), invalidates=TRACES),    # Color of the lageral g force trace
+    Field('gz_color', 'rgba', (0.5, 0.0, 0.9, 1.0), invalidates=TRACES),    # Color of the longitudinal g force trace
+    Field('ffb_color', 'rgba', (0.55, 0.55, 0.55, 1.0), invalidates=TRACES),    # Color of the force feedback trace
+)
+FIELDS_BY_NAME = {field.name: field for field in FIELDS}
+OPTIONS = [field.name for field in FIELDS]
+OPTION_ORDER = {name: i for i, name in enumerate(OPTIONS)}
+
+
+def section_name(profile):
+    return 'GENERAL' if profile == DEFAULT_PROFILE else PROFILE_PREFIX + profile
+
+
+class ConfigWriter:
+    """
+    Writes config files on a background thread, the update thread never waits for disk.
+    Only the newest pending text is kept, older texts that were not written yet are superseded.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = None
+        self._wake = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._thread = None
+
+    def write(self, path, text):
+        with self._lock:
+            self._pending = (path, text)
+            self._idle.clear()
+            if not self._thread:
+                self._thread = threading.Thread(target=self._write_loop, name='telemetry config writer')
+                self._thread.daemon = True
+                self._thread.start()
+        self._wake.set()
+
+    def wait(self, timeout=None):
+        """Block until everything handed to write() is on disk"""
+        return self._idle.wait(timeout)
+
+    def _write_loop(self):
+        while True:
+            self._wake.wait()
+            with self._lock:
+                self._wake.clear()
+                job = self._pending
+                self._pending = None
+
+            if job:
+                try:
+                    write_atomic(*job)
+                except Exception as e:
+                    console_exception(e, 'Failed to write config', True)
+
+            with self._lock:
+                if self._pending is None:
+                    self._idle.set()
 
 
 class Config:
-    """App configuration. Load config upon intialization."""
+    """
+    App configuration. Load config upon intialization.
+    Options are slots generated from FIELDS, loading and saving is driven by the same schema.
+
+    Every profile is parsed at startup into `profiles`, the default profile holds every option,
+    other profiles only the options they override. The slots hold the values of the active profile.
+    """
+    __slots__ = tuple(OPTIONS) + (
+        'update_cfg', 'changed', 'changed_time', 'writer', 'cfg_file_path', 'cfg_parser', 'listeners',
+        'profile', 'profiles',
+    )
 
     def __init__(self):
         self.update_cfg = False
+        # (section, option) pairs to write
+        self.changed = set()
+        self.changed_time = 0.0
+        self.writer = ConfigWriter()
+        # called with (option, invalidated parts) for every set(), option is None for a profile switch
+        self.listeners = []
+        self.profile = DEFAULT_PROFILE
+        self.profiles = {DEFAULT_PROFILE: {}}
         self.cfg_file_path = config_path
         self.cfg_parser = configparser.ConfigParser(inline_comment_prefixes=";")
         self.set_defaults()
         self.parse_config()
-    
+
     def set_defaults(self, save=False):
-        self.show_throttle=True  # Show throttle trace
-        self.show_brake=True # Show brake trace
-        self.show_clutch=False   # Show clutch trace
-        self.show_steering=False    # Show steering trace
-        self.show_handbrake=False   # Show handbrake trace
-        self.show_gx=False  # Show lageral g force trace
-        self.show_gz=False  # Show longitudinal g force trace
-        self.show_ffb=False # Show force feedback trace
-        self.show_throttle_bar=False    # Show throttle bar
-        self.show_brake_bar=False   # Show brake bar
-        self.show_clutch_bar=False  # Show clutch bar
-        self.show_handbrake_bar=False  # Show handbrake bar
-        self.show_ffb_bar=False  # Show force feedback bar
-        self.show_bar_value=False   # Show number value above bar
-        self.show_graph_lines=False # Show horizontal graph lines
-        self.show_telemetry_label=False # Show temetry label
-        self.show_wheel=False # Show wheel circle
-        self.open_settings_click=True # Open settings window on clicking left side of the main window
-        self.metric=True    # Use metric values
-        self.wheel_show_gear=True   # Show gear label in wheel
-        self.wheel_show_speed=True  # Show speed label in wheel
-        self.pedals_end_stop=True   # Pedal end stop indicator
-        self.pedals_base_stop=False # Pedal base stop indicator
-        self.ffb_flash_on_clip=True # Flash force feedback bar red when clipping
-        self.app_height=100  # App height (Specifies the height of the app in pixels); from 10 to 1000
-        self.app_width=300   # App width in pixels; from 10 to 1000
-        self.sample_rate=40  # Traces sample rate; from  1 hz to 100 hz
-        self.trace_size=2.0  # Trace line thickness; from 1 px to 10 px
-        self.opacity=0.5 # App opacity (between 0.0 and 1.0)
-        self.denoise_g=5    # Number of measurements to combine to denoise g force traces
-        self.padding=0  # Padding around main window
-        self.bar_width=10   # Width of bars
-        self.steering_sensitivity=720   # Max value for steering in graph
-        self.wheel_depth=8  # Thickness of the wheel
-        self.wheel_angle=15 # Width of the wheel
-        self.throttle_color=(0.16, 1.0, 0.0, 1.0)    # Color of the throttle trace
-        self.brake_color=(1.0, 0.16, 0.0, 1.0)   # Color of the brake trace
-        self.clutch_color=(0.16, 1.0, 1.0, 1.0)  # Color of the clutch trace
-        self.steering_color=(0.9, 0.9, 0.9, 1.0)  # Color of the steering trace
-        self.handbrake_color=(0.0, 0.16, 1.0, 1.0)   # Color of the handbrake trace
-        self.gx_color=(1.0, 0.9, 0.0, 1.0)  # Color of the lageral g force trace
-        self.gz_color=(0.5, 0.0, 0.9, 1.0)  # Color of the longitudinal g force trace
-        self.ffb_color=(0.55, 0.55, 0.55, 1.0) # Color of the force feedback trace
-        
+        """Schema defaults, with `save` they replace the options of the active profile"""
+        for field in FIELDS:
+            setattr(self, field.name, field.default)
+
         if save:
-            self.save()
+            section = section_name(self.profile)
+            self.profiles[self.profile] = {field.name: field.default for field in FIELDS}
+            self.changed.update((section, field.name) for field in FIELDS)
+            self.update_cfg = True
+            self.save_changes(force=True)
 
     def parse_config(self):
         """Initialize config parser and load config"""
@@ -68,159 +253,173 @@ class Config:
 
         if not self.cfg_parser.has_section('GENERAL'):
             self.cfg_parser.add_section('GENERAL')
-                
-        # Load attributes from config.
-        self.get_bool('GENERAL', 'show_throttle')
-        self.get_bool('GENERAL', 'show_brake')
-        self.get_bool('GENERAL', 'show_clutch')
-        self.get_bool('GENERAL', 'show_steering')
-        self.get_bool('GENERAL', 'show_handbrake')
-        self.get_bool('GENERAL', 'show_gx')
-        self.get_bool('GENERAL', 'show_gz')
-        self.get_bool('GENERAL', 'show_ffb')
-        self.get_bool('GENERAL', 'show_throttle_bar')
-        self.get_bool('GENERAL', 'show_brake_bar')
-        self.get_bool('GENERAL', 'show_clutch_bar')
-        self.get_bool('GENERAL', 'show_handbrake_bar')
-        self.get_bool('GENERAL', 'show_ffb_bar')
-        self.get_bool('GENERAL', 'show_bar_value')
-        self.get_bool('GENERAL', 'show_graph_lines')
-        self.get_bool('GENERAL', 'show_telemetry_label')
-        self.get_bool('GENERAL', 'show_wheel')
-        self.get_bool('GENERAL', 'open_settings_click')
-        self.get_bool('GENERAL', 'metric')
-        self.get_bool('GENERAL', 'wheel_show_gear')
-        self.get_bool('GENERAL', 'wheel_show_speed')
-        self.get_bool('GENERAL', 'pedals_end_stop')
-        self.get_bool('GENERAL', 'pedals_base_stop')
-        self.get_bool('GENERAL', 'ffb_flash_on_clip')
-        self.get_int('GENERAL', 'app_height')
-        self.get_int('GENERAL', 'app_width')
-        self.get_int('GENERAL', 'sample_rate')
-        self.get_int('GENERAL', 'trace_size')
-        self.get_int('GENERAL', 'denoise_g')
-        self.get_int('GENERAL', 'padding')
-        self.get_int('GENERAL', 'bar_width')
-        self.get_int('GENERAL', 'steering_sensitivity')
-        self.get_int('GENERAL', 'wheel_depth')
-        self.get_int('GENERAL', 'wheel_angle')
-        self.get_float('GENERAL', 'opacity')
-        self.get_rgba('GENERAL', 'throttle_color')
-        self.get_rgba('GENERAL', 'brake_color')
-        self.get_rgba('GENERAL', 'clutch_color')
-        self.get_rgba('GENERAL', 'steering_color')
-        self.get_rgba('GENERAL', 'gx_color')
-        self.get_rgba('GENERAL', 'gz_color')
-        self.get_rgba('GENERAL', 'handbrake_color')
-        self.get_rgba('GENERAL', 'ffb_color')
-
-        # If update_cfg has been triggered (set to True), run save to update file.
-        if self.update_cfg:
-            self.save()
-        
-
-    def save(self):
-        """Save config file"""
-        console('saving config')
 
-        self.cfg_parser.set('GENERAL', 'show_throttle', str(self.show_throttle))
-        self.cfg_parser.set('GENERAL', 'show_brake', str(self.show_brake))
-        self.cfg_parser.set('GENERAL', 'show_clutch', str(self.show_clutch))
-        self.cfg_parser.set('GENERAL', 'show_steering', str(self.show_steering))
-        self.cfg_parser.set('GENERAL', 'show_handbrake', str(self.show_handbrake))
-        self.cfg_parser.set('GENERAL', 'show_gx', str(self.show_gx))
-        self.cfg_parser.set('GENERAL', 'show_gz', str(self.show_gz))
-        self.cfg_parser.set('GENERAL', 'show_ffb', str(self.show_ffb))
-        self.cfg_parser.set('GENERAL', 'show_throttle_bar', str(self.show_throttle_bar))
-        self.cfg_parser.set('GENERAL', 'show_brake_bar', str(self.show_brake_bar))
-        self.cfg_parser.set('GENERAL', 'show_clutch_bar', str(self.show_clutch_bar))
-        self.cfg_parser.set('GENERAL', 'show_handbrake_bar', str(self.show_handbrake_bar))
-        self.cfg_parser.set('GENERAL', 'show_ffb_bar', str(self.show_ffb_bar))
-        self.cfg_parser.set('GENERAL', 'show_bar_value', str(self.show_bar_value))
-        self.cfg_parser.set('GENERAL', 'show_graph_lines', str(self.show_graph_lines))
-        self.cfg_parser.set('GENERAL', 'show_telemetry_label', str(self.show_telemetry_label))
-        self.cfg_parser.set('GENERAL', 'open_settings_click', str(self.open_settings_click))
-        self.cfg_parser.set('GENERAL', 'metric', str(self.metric))
-        self.cfg_parser.set('GENERAL', 'wheel_show_gear', str(self.wheel_show_gear))
-        self.cfg_parser.set('GENERAL', 'wheel_show_speed', str(self.wheel_show_speed))
-        self.cfg_parser.set('GENERAL', 'pedals_end_stop', str(self.pedals_end_stop))
-        self.cfg_parser.set('GENERAL', 'pedals_base_stop', str(self.pedals_base_stop))
-        self.cfg_parser.set('GENERAL', 'ffb_flash_on_clip', str(self.ffb_flash_on_clip))
-        self.cfg_parser.set('GENERAL', 'app_height', str(self.app_height))
-        self.cfg_parser.set('GENERAL', 'app_width', str(self.app_width))
-        self.cfg_parser.set('GENERAL', 'sample_rate', str(self.sample_rate))
-        self.cfg_parser.set('GENERAL', 'opacity', str(self.opacity))
-        self.cfg_parser.set('GENERAL', 'trace_size', str(self.trace_size))
-        self.cfg_parser.set('GENERAL', 'denoise_g', str(self.denoise_g))
-        self.cfg_parser.set('GENERAL', 'padding', str(self.padding))
-        self.cfg_parser.set('GENERAL', 'bar_width', str(self.bar_width))
-        self.cfg_parser.set('GENERAL', 'show_wheel', str(self.show_wheel))
-        self.cfg_parser.set('GENERAL', 'steering_sensitivity', str(self.steering_sensitivity))
-        self.cfg_parser.set('GENERAL', 'wheel_depth', str(self.wheel_depth))
-        self.cfg_parser.set('GENERAL', 'wheel_angle', str(self.wheel_angle))
-
-        # serialize rgba tuples
-        color_attrs = [
-            'throttle_color',
-            'brake_color',
-            'clutch_color',
-            'steering_color',
-            'gx_color',
-            'gz_color',
-            'handbrake_color',
-            'ffb_color'
-        ]
-        for rgba in color_attrs:
-            value = ','.join([str(int(i * 100)) for i in getattr(self, rgba)])
-            self.cfg_parser.set('GENERAL', rgba, value)
-        
-        
-        with open(self.cfg_file_path, 'w') as cfgfile:
-            self.cfg_parser.write(cfgfile)
-
-
-    def get_float(self, section, option):
-        try:
-            value = self.cfg_parser.getfloat(section, option)
-        except:
-            value = getattr(self, option)
-            self.update_cfg = True
-        
-        self.__setattr__(option, value)
+        self.profiles = {DEFAULT_PROFILE: self.parse_section('GENERAL', True)}
+        for section in self.cfg_parser.sections():
+            if section.startswith(PROFILE_PREFIX):
+                self.profiles[section[len(PROFILE_PREFIX):]] = self.parse_section(section)
 
+        active = DEFAULT_PROFILE
+        if self.cfg_parser.has_option(PROFILES_SECTION, 'active'):
+            active = self.cfg_parser.get(PROFILES_SECTION, 'active', raw=True)
+        if active not in self.profiles:
+            active = DEFAULT_PROFILE
+        self.profile = active
+        for name, value in self.profile_values(active).items():
+            setattr(self, name, value)
 
-    def get_bool(self, section, option):      
-        try:
-            value = self.cfg_parser.getboolean(section, option)
-        except:
-            value = getattr(self, option)
-            self.update_cfg = True
-        
-        self.__setattr__(option, value)
+        # If update_cfg has been triggered (set to True), write the missing or invalid options.
+        self.save_changes(force=True)
 
+    def parse_section(self, section, complete=False):
+        """
+        Options of a section parsed through the schema. With `complete` missing and invalid
+        options get their default, otherwise they are left out and inherit the default profile.
+        """
+        # raw strings in a single pass, without the per option lookup and interpolation of configparser
+        texts = dict(self.cfg_parser.items(section, raw=True))
+        values = {}
+        for field in FIELDS:
+            text = texts.get(field.name)
+            if text is None and not complete:
+                continue
 
-    def get_int(self, section, option):       
-        try:
-            value = self.cfg_parser.getint(section, option)
-        except:
             try:
-                value = int(self.cfg_parser.getfloat(section, option))
-            except:
-                value = getattr(self, option)
-            
-            self.update_cfg = True
-        
-        self.__setattr__(option, value)
-
-
-    # rgba value are represented as four 0-100 int values saperated by a ","
-    def get_rgba(self, section, option):       
-        try:
-            value = self.cfg_parser.get(section, option)
-            values = [int(s) / 100 for s in value.split(',')]
-            rgba = (values[0], values[1], values[2], values[3])
-        except:
-            rgba = getattr(self, option)
-            self.update_cfg = True
-        
-        self.__setattr__(option, rgba)
+                value = field.validate(field.parse(text))
+            except Exception:
+                # missing or invalid
+                if not complete:
+                    self.cfg_parser.remove_option(section, field.name)
+                    continue
+                value = field.default
+
+            values[field.name] = value
+            # missing, invalid, out of range or not in the canonical form, written back below
+            if text is None or field.serialize(value) != text:
+                self.changed.add((section, field.name))
+                self.update_cfg = True
+
+        return values
+
+    def profile_values(self, profile):
+        """Every option of a profile, the default profile with the overrides of `profile`"""
+        values = dict(self.profiles[DEFAULT_PROFILE])
+        values.update(self.profiles[profile])
+        return values
+
+    def profile_names(self):
+        """Default profile first, the others by name"""
+        return [DEFAULT_PROFILE] + sorted(name for name in self.profiles if name != DEFAULT_PROFILE)
+
+    def next_profile(self):
+        names = self.profile_names()
+        return names[(names.index(self.profile) + 1) % len(names)]
+
+    def switch_profile(self, profile):
+        """
+        Make `profile` the active one. Only the options that differ are changed, the listeners are
+        notified once with everything they invalidate.
+        """
+        if profile == self.profile or profile not in self.profiles:
+            return
+
+        changes = 0
+        for name, value in self.profile_values(profile).items():
+            if getattr(self, name) != value:
+                setattr(self, name, value)
+                changes |= FIELDS_BY_NAME[name].invalidates
+
+        self.profile = profile
+        self._changed(PROFILES_SECTION, 'active')
+        for listener in self.listeners:
+            listener(None, changes)
+
+    def add_profile(self, profile):
+        """New profile with the current options, made active"""
+        if profile in self.profiles:
+            return
+
+        defaults = self.profiles[DEFAULT_PROFILE]
+        overrides = {name: getattr(self, name) for name in OPTIONS if getattr(self, name) != defaults[name]}
+        self.profiles[profile] = overrides
+        for name in overrides:
+            self._changed(section_name(profile), name)
+        self.switch_profile(profile)
+
+    def remove_profile(self, profile):
+        """Delete a profile, the default profile is activated when it was the active one"""
+        if profile == DEFAULT_PROFILE or profile not in self.profiles:
+            return
+
+        if profile == self.profile:
+            self.switch_profile(DEFAULT_PROFILE)
+        del self.profiles[profile]
+        self.changed = set(entry for entry in self.changed if entry[0] != section_name(profile))
+        self.cfg_parser.remove_section(section_name(profile))
+        self._changed(PROFILES_SECTION, 'active')
+
+    def set(self, option, value):
+        """
+        Change an option of the active profile and notify the listeners with the parts of the app
+        it invalidates. The option is written by save_changes() once changes have settled.
+        """
+        field = FIELDS_BY_NAME[option]
+        value = field.validate(value)
+        setattr(self, option, value)
+        self.profiles[self.profile][option] = value
+        self._changed(section_name(self.profile), option)
+
+        for listener in self.listeners:
+            listener(option, field.invalidates)
+
+    def _changed(self, section, option):
+        self.changed.add((section, option))
+        self.changed_time = time.monotonic()
+        self.update_cfg = True
+
+    def save_changes(self, force=False):
+        """
+        Save the options changed since the last save, but only after SAVE_DELAY seconds without
+        new changes, so dragging a spinner writes the file once. `force` skips the wait.
+        """
+        if not self.update_cfg:
+            return
+        if not force and time.monotonic() - self.changed_time < SAVE_DELAY:
+            return
+
+        changed = self.changed
+        self.changed = set()
+        self.update_cfg = False
+        self.save(changed)
+
+    def save(self, changed=None):
+        """
+        Serialize the `changed` (section, option) pairs, every option of every profile by default,
+        and hand the file to the background writer.
+        """
+        console('saving config')
+
+        if changed is None:
+            changed = set((section_name(profile), name) for profile, values in self.profiles.items() for name in values)
+            changed.add((PROFILES_SECTION, 'active'))
+
+        profiles = {section_name(profile): values for profile, values in self.profiles.items()}
+        for section in profiles:
+            if not self.cfg_parser.has_section(section):
+                self.cfg_parser.add_section(section)
+
+        # keep the file in a stable order however the options were changed
+        for section, option in sorted(changed, key=lambda entry: (entry[0], OPTION_ORDER.get(entry[1], -1))):
+            if section == PROFILES_SECTION:
+                if not self.cfg_parser.has_section(PROFILES_SECTION):
+                    self.cfg_parser.add_section(PROFILES_SECTION)
+                self.cfg_parser.set(PROFILES_SECTION, 'active', self.profile)
+            elif section in profiles and option in profiles[section]:
+                self.cfg_parser.set(section, option, FIELDS_BY_NAME[option].serialize(profiles[section][option]))
+
+        text = io.StringIO()
+        self.cfg_parser.write(text)
+        self.writer.write(self.cfg_file_path, text.getvalue())
+
+    def serialize(self, option):
+        return FIELDS_BY_NAME[option].serialize(getattr(self, option))
@@ -1,6 +1,7 @@
 import ac, acsys
 
 import os
+import re
 import sys
 import platform
 
@@ -19,44 +20,171 @@ sys.path.insert(0, sysdir)
 os.environ['PATH'] = os.environ['PATH'] + ";."
 
 from _telemetry_overlay.lib.sim_info import info
+from _telemetry_overlay.buffers import RingSmoother
+from _telemetry_overlay.delta import DeltaTimer
 
+# shared memory is only written for the car driven by the player
+PLAYER_CAR_ID = 0
+KPH_PER_MPH = 1.609344
 
-class TelemetryData:
-    car_id = 0
-    replay_time_multiplier = 0
-    throttle = 0
-    brake = 0
-    clutch = 0
-    handbrake = 0
-    steering = 0
-    steering_norm = 0.5
-    ffb = 0
-    gx_values = []
-    gz_values = []
-    max_x = 2.8
-    max_z = 2.8
-    gear_str = 'N'
-    speed_kph = 0
-    speed_mph = 0
 
+class TelemetryData:
     def __init__(self, IS_CSP, config):
         self.IS_CSP = IS_CSP
         self.config = config
+        # moving averages to denoise g forces
+        self.gx_values = RingSmoother(config.denoise_g)
+        self.gz_values = RingSmoother(config.denoise_g)
+        # running delta to the best lap of the session
+        self.delta = DeltaTimer()
+        self.reset()
         self.update_globals()
         self.update_telemetry()
+
+    def reset(self):
+        """Drop all samples and return every channel to its idle value"""
+        self.car_id = 0
+        self.replay_time_multiplier = 0
+        self.throttle = 0
+        self.brake = 0
+        self.clutch = 0
+        self.handbrake = 0
+        self.steering = 0
+        self.steering_norm = 0.5
+        self.ffb = 0
+        self.max_x = 2.8
+        self.max_z = 2.8
+        self.gear_str = 'N'
+        self.speed_kph = 0
+        self.speed_mph = 0
+        self.packet_id = -1
+        self.steer_degrees = None
+        self.sampled_packet_id = -1
+        self.skipped_samples = 0
+        self.lap = 0
+        self.sector = 0
+        self.lap_time = 0
+        self.position = 0.0
+
+        self.gx_values.clear()
+        self.gz_values.clear()
+        self.delta.reset()
+
+    def memory_report(self):
+        """Bytes held per sample store, keyed by channel"""
+        return {
+            'gx': self.gx_values.nbytes(),
+            'gz': self.gz_values.nbytes(),
+        }
     
     def update_globals(self):
         """Update the data required for telemetry"""
-        self.car_id = ac.getFocusedCar()
+        car_id = ac.getFocusedCar()
+        if car_id != self.car_id:
+            # samples of the previously focused car must not bleed into the new one
+            self.gx_values.clear()
+            self.gz_values.clear()
+            self.packet_id = -1
+            self.steer_degrees = None
+            self.delta.reset()
+        self.car_id = car_id
         self.replay_time_multiplier = info.graphics.replayTimeMultiplier
+
+        # shared memory only reports normalized steering input,
+        # learn the steering lock of the car to convert it to degrees
+        if self.config.use_shared_memory and self.car_id == PLAYER_CAR_ID:
+            steer_input = info.physics.steerAngle
+            if abs(steer_input) > 0.05:
+                self.steer_degrees = ac.getCarState(self.car_id, acsys.CS.Steer) / steer_input
     
+    def session_tag(self):
+        """Track, layout and car of the session, safe to use in file names"""
+        tag = '-'.join(part for part in [info.static.track, info.static.trackConfiguration, info.static.carModel] if part)
+        return re.sub(r'[^A-Za-z0-9_.-]+', '', tag.replace('_', '-'))
+
+    def frame_advanced(self):
+        """
+        Check if the sim produced a new physics frame since the last call.
+        Paused sessions or a sim running slower than the sample rate repeat the same frame,
+        those samples are counted in `skipped_samples`.
+        Shared memory physics only describe the player car, samples read through getCarState
+        are never skipped.
+        """
+        if not (self.config.use_shared_memory and self.car_id == PLAYER_CAR_ID):
+            return True
+
+        packet_id = info.physics.packetId
+        # packetId stays 0 when shared memory is not being written, never skip in that case
+        if packet_id and packet_id == self.sampled_packet_id:
+            self.skipped_samples += 1
+            return False
+
+        self.sampled_packet_id = packet_id
+        return True
+
     def update_telemetry(self):
-        """Update telemetry data"""
-        self.throttle = ac.getCarState(self.car_id, acsys.CS.Gas)
-        self.brake = ac.getCarState(self.car_id, acsys.CS.Brake)
-        self.clutch = 1 - ac.getCarState(self.car_id, acsys.CS.Clutch)
-        self.ffb = ac.getCarState(self.car_id, acsys.CS.LastFF)
-        self.steering = ac.getCarState(self.car_id, acsys.CS.Steer)
+        """
+        Update telemetry data.
+        Returns False when the shared memory frame has not advanced since the last update.
+        """
+        # shared memory only holds data of the player car
+        if self.config.use_shared_memory and self.car_id == PLAYER_CAR_ID:
+            physics = info.physics
+            packet_id = physics.packetId
+            if packet_id == self.packet_id:
+                return False
+            self.packet_id = packet_id
+
+            self.throttle = physics.gas
+            self.brake = physics.brake
+            self.clutch = 1 - physics.clutch
+            self.ffb = physics.finalFF
+            if self.steer_degrees is None:
+                self.steering = ac.getCarState(self.car_id, acsys.CS.Steer)
+            else:
+                self.steering = physics.steerAngle * self.steer_degrees
+            gx = physics.accG[0]
+            gz = physics.accG[2]
+            gear = physics.gear
+            self.speed_kph = physics.speedKmh
+            self.speed_mph = self.speed_kph / KPH_PER_MPH
+        else:
+            self.packet_id = -1
+            self.throttle = ac.getCarState(self.car_id, acsys.CS.Gas)
+            self.brake = ac.getCarState(self.car_id, acsys.CS.Brake)
+            self.clutch = 1 - ac.getCarState(self.car_id, acsys.CS.Clutch)
+            self.ffb = ac.getCarState(self.car_id, acsys.CS.LastFF)
+            self.steering = ac.getCarState(self.car_id, acsys.CS.Steer)
+            g = ac.getCarState(self.car_id, acsys.CS.AccG)
+            gx = g[0]
+            gz = g[2]
+            gear = ac.getCarState(self.car_id, acsys.CS.Gear)
+            self.speed_kph = ac.getCarState(self.car_id, acsys.CS.SpeedKMH)
+            self.speed_mph = ac.getCarState(self.car_id, acsys.CS.SpeedMPH)
+
+        # lap state is only used by the recorder, the reference lap and the delta,
+        # other cars cost three extra getCarState calls per sample
+        config = self.config
+        if config.record_telemetry or config.show_ghost or config.wheel_show_delta:
+            if self.car_id == PLAYER_CAR_ID:
+                graphics = info.graphics
+                self.lap = graphics.completedLaps
+                self.sector = graphics.currentSectorIndex
+                self.lap_time = graphics.iCurrentTime
+                self.position = graphics.normalizedCarPosition
+            else:
+                self.lap = ac.getCarState(self.car_id, acsys.CS.LapCount)
+                # sectors are only published for the player car
+                self.sector = 0
+                self.lap_time = ac.getCarState(self.car_id, acsys.CS.LapTime)
+                self.position = ac.getCarState(self.car_id, acsys.CS.NormalizedSplinePosition)
+
+        if config.wheel_show_delta:
+            self.delta.update(self.lap, self.position, self.lap_time)
+        elif self.delta.lap != -1:
+            # laps driven while the delta is hidden are incomplete, never compare them
+            self.delta.abandon_lap()
+
         self.steering_norm = min(
             max(
                 0.5 + (self.steering / self.config.steering_sensitivity) * -1,
@@ -68,13 +196,12 @@ class TelemetryData:
         if self.IS_CSP:
             self.handbrake = ac.ext_getHandbrake(self.car_id)
         
-        g = ac.getCarState(self.car_id, acsys.CS.AccG)
-        while len(self.gx_values) >= self.config.denoise_g: self.gx_values.pop(0)
-        while len(self.gz_values) >= self.config.denoise_g: self.gz_values.pop(0)
-        self.gx_values.append(min(max(g[0] * -1, self.max_x * -1.1), self.max_x * 1.1))
-        self.gz_values.append(min(max(g[2] * -1, self.max_z * -1.1), self.max_z * 1.1))
+        if self.gx_values.size != self.config.denoise_g:
+            self.gx_values.resize(self.config.denoise_g)
+            self.gz_values.resize(self.config.denoise_g)
+        self.gx_values.push(min(max(gx * -1, self.max_x * -1.1), self.max_x * 1.1))
+        self.gz_values.push(min(max(gz * -1, self.max_z * -1.1), self.max_z * 1.1))
 
-        gear = ac.getCarState(self.car_id, acsys.CS.Gear)
         if gear == 0:
             self.gear_str = 'R'
         elif gear == 1:
@@ -82,23 +209,22 @@ class TelemetryData:
         else:
             self.gear_str = str(gear - 1)
 
-        self.speed_kph = ac.getCarState(self.car_id, acsys.CS.SpeedKMH)
-        self.speed_mph = ac.getCarState(self.car_id, acsys.CS.SpeedMPH)
+        return True
         
     def get_gx(self):
-        if not len(self.gx_values):
+        if not self.gx_values.count:
             return 0.5
         
-        avg_x = sum(self.gx_values) / len(self.gx_values)
+        avg_x = self.gx_values.mean()
         if abs(avg_x) > self.max_x: self.max_x = abs(avg_x)
 
         return 0.5 + avg_x / (self.max_x * 2)
     
     def get_gz(self):
-        if not len(self.gz_values):
+        if not self.gz_values.count:
             return 0.5
         
-        avg_z = sum(self.gz_values) / len(self.gz_values)
+        avg_z = self.gz_values.mean()
         if abs(avg_z) > self.max_z: self.max_z = abs(avg_z)
 
         return 0.5 + avg_z / (self.max_z * 2)
@@ -0,0 +1,90 @@
+from array import array
+
+# number of track position buckets, ~3m per bucket on a 6km track
+DELTA_RESOLUTION = 2000
+# a lap only counts as complete when it started and ended within this fraction of the track
+LAP_EDGE_TOLERANCE = 0.02
+
+
+class DeltaTimer:
+    """
+    Running delta to the best lap of the session.
+    Lap time is stored per track position bucket for the current and the best lap; every update
+    only fills the buckets passed since the previous update, so the cost is O(1) amortized.
+    A new best lap becomes the reference by swapping the two tables.
+    """
+    __slots__ = ('resolution', 'best', 'current', 'best_time', 'lap', 'bucket', 'started', 'last_time', 'delta', 'valid')
+
+    def __init__(self, resolution=DELTA_RESOLUTION):
+        self.resolution = resolution
+        self.best = array('i', [0]) * resolution
+        self.current = array('i', [0]) * resolution
+        self.best_time = 0
+        self.delta = 0.0
+        self.valid = False
+        self._start_lap(-1)
+
+    def _start_lap(self, lap):
+        self.lap = lap
+        self.bucket = -1
+        self.started = False
+        self.last_time = 0
+
+    def reset(self):
+        """Forget the best lap, e.g. when the session or car changes"""
+        self.best_time = 0
+        self.delta = 0.0
+        self.valid = False
+        self._start_lap(-1)
+
+    def abandon_lap(self):
+        """Drop the lap in progress, keeping the best lap, e.g. when samples stop being fed"""
+        self._start_lap(-1)
+
+    def update(self, lap, position, lap_time):
+        """Feed the lap count, normalized track position and current lap time (ms) of a sample"""
+        resolution = self.resolution
+
+        if lap != self.lap:
+            completed = (
+                lap == self.lap + 1
+                and self.started
+                and self.bucket >= resolution * (1 - LAP_EDGE_TOLERANCE)
+            )
+            if completed and (not self.best_time or self.last_time < self.best_time):
+                self.best, self.current = self.current, self.best
+                self.best_time = self.last_time
+            self._start_lap(lap)
+
+        if position > 1 - LAP_EDGE_TOLERANCE and self.bucket <= resolution * LAP_EDGE_TOLERANCE:
+            # lap count changed before the track position wrapped, still at the start line
+            position = 0.0
+
+        bucket = int(position * resolution)
+        if bucket >= resolution:
+            bucket = resolution - 1
+        elif bucket < 0:
+            bucket = 0
+
+        current = self.current
+        prev_bucket = self.bucket
+        if prev_bucket == -1:
+            self.started = bucket <= resolution * LAP_EDGE_TOLERANCE
+            for i in range(bucket + 1):
+                current[i] = lap_time * i // max(bucket, 1)
+        elif bucket > prev_bucket:
+            prev_time = self.last_time
+            steps = bucket - prev_bucket
+            for i in range(1, steps + 1):
+                current[prev_bucket + i] = prev_time + (lap_time - prev_time) * i // steps
+        else:
+            # standing still or position jumped back, keep the furthest point
+            bucket = prev_bucket
+
+        self.bucket = bucket
+        self.last_time = lap_time
+
+        if self.best_time:
+            self.delta = (lap_time - self.best[bucket]) / 1000
+            self.valid = True
+        return self.delta
@@ -0,0 +1,153 @@
+from array import array
+import threading
+
+from _telemetry_overlay.recorder import Recording, find_recordings
+from _telemetry_overlay.utils import console, console_exception
+
+# number of track position buckets of a reference lap
+GHOST_RESOLUTION = 2000
+# channels drawn as ghost traces
+GHOST_CHANNELS = ['throttle', 'brake']
+# a lap is complete when its samples cover the track from start to finish
+LAP_START_MAX = 0.02
+LAP_END_MIN = 0.98
+
+
+class GhostLap:
+    """
+    Reference lap resampled onto a fixed track position grid.
+    Looking up a value is a single table index, no search or allocation.
+    """
+
+    def __init__(self, lap_time, tables, resolution=GHOST_RESOLUTION):
+        self.lap_time = lap_time
+        self.tables = tables
+        self.resolution = resolution
+
+    def getter(self, channel):
+        """Return a function reading the reference value of `channel` at the telemetry position"""
+        table = self.tables[channel]
+        resolution = self.resolution
+
+        def get(telemetry):
+            return table[int(telemetry.position * resolution) % resolution]
+
+        return get
+
+    @classmethod
+    def from_samples(cls, lap_time, positions, channels, resolution=GHOST_RESOLUTION):
+        """Resample (position, value) samples onto the grid, filling gaps by linear interpolation"""
+        tables = {}
+        for name, values in channels.items():
+            tables[name] = resample(positions, values, resolution)
+        return cls(lap_time, tables, resolution)
+
+
+def resample(positions, values, resolution):
+    table = array('f', [0.0]) * resolution
+    if not len(positions):
+        return table
+
+    prev_bucket = None
+    prev_value = values[0]
+    for position, value in zip(positions, values):
+        if at_lap_start(position, prev_bucket, resolution):
+            position = 0.0
+        bucket = min(int(position * resolution), resolution - 1)
+        if prev_bucket is None:
+            # before the first sample, hold its value
+            for i in range(bucket + 1):
+                table[i] = value
+        elif bucket > prev_bucket:
+            steps = bucket - prev_bucket
+            for i in range(1, steps + 1):
+                table[prev_bucket + i] = prev_value + (value - prev_value) * i / steps
+        elif bucket < prev_bucket:
+            # position jumped back (reset or spline glitch), ignore the sample
+            continue
+
+        prev_bucket = bucket
+        prev_value = value
+
+    # after the last sample, hold its value
+    for i in range(prev_bucket + 1, resolution):
+        table[i] = prev_value
+
+    return table
+
+
+def at_lap_start(position, prev_bucket, resolution):
+    """
+    True for samples of the previous lap end recorded at the start of a lap:
+    the lap count can change a few samples before the track position wraps.
+    """
+    return position > 1 - LAP_START_MAX and (prev_bucket is None or prev_bucket <= resolution * LAP_START_MAX)
+
+
+def best_lap(recording):
+    """Lap number and lap time (ms) of the fastest complete lap in a recording"""
+    best = None
+    for lap in recording.laps():
+        positions = recording.lap_column('position', lap)
+        first = 0
+        while first < len(positions) and at_lap_start(positions[first], None, GHOST_RESOLUTION):
+            first += 1
+        if first == len(positions) or positions[first] > LAP_START_MAX or max(positions[first:]) < LAP_END_MIN:
+            continue
+
+        lap_time = max(recording.lap_column('lap_time', lap))
+        if lap_time > 0 and (best is None or lap_time < best[1]):
+            best = (lap, lap_time)
+
+    return best
+
+
+def load_ghost(directory, tag, channels=GHOST_CHANNELS):
+    """Build a ghost from the fastest complete lap of the newest recording of this session tag"""
+    for path in find_recordings(directory, tag):
+        try:
+            recording = Recording(path)
+            try:
+                found = [name for name in channels if name in recording.channels]
+                best = best_lap(recording) if found else None
+                if not best:
+                    continue
+
+                lap, lap_time = best
+                ghost = GhostLap.from_samples(
+                    lap_time,
+                    recording.lap_column('position', lap),
+                    {name: recording.lap_column(name, lap) for name in found},
+                )
+                console('loaded reference lap', lap, 'from', path)
+                return ghost
+            finally:
+                recording.close()
+        except Exception as e:
+            console_exception(e, 'Failed to load reference lap from "' + path + '"')
+
+    return None
+
+
+class GhostLoader:
+    """
+    Loads the reference lap on a background thread, reading a recording without numpy takes seconds.
+    `done` is set once `ghost` holds the result, None when no usable lap was found.
+    """
+
+    def __init__(self, directory, tag, channels=GHOST_CHANNELS):
+        self.tag = tag
+        self.ghost = None
+        self.done = False
+
+        self._thread = threading.Thread(target=self._load, args=(directory, tag, channels), name='reference lap loader')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _load(self, directory, tag, channels):
+        try:
+            self.ghost = load_ghost(directory, tag, channels)
+        except Exception as e:
+            console_exception(e, 'Failed to load reference lap')
+        finally:
+            self.done = True
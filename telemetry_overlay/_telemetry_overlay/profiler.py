@@ -0,0 +1,114 @@
+import time
+from array import array
+
+# durations kept per hot path, about 6s of frames at 40 fps
+PROFILE_SAMPLES = 256
+
+
+class TimingBuffer:
+    """Last `size` durations of a hot path in a preallocated ring, percentiles are computed on read"""
+    __slots__ = ('values', 'head', 'count', 'calls')
+
+    def __init__(self, size=PROFILE_SAMPLES):
+        self.values = array('d', [0.0]) * size
+        self.head = 0
+        self.count = 0
+        self.calls = 0
+
+    def add(self, duration):
+        values = self.values
+        values[self.head] = duration
+        self.head = (self.head + 1) % len(values)
+        if self.count < len(values):
+            self.count += 1
+        self.calls += 1
+
+    def summary(self):
+        """(p50, p99, max) in seconds over the buffered durations"""
+        if not self.count:
+            return 0.0, 0.0, 0.0
+
+        ordered = sorted(self.values[:self.count])
+        last = self.count - 1
+        return ordered[last // 2], ordered[last * 99 // 100], ordered[last]
+
+
+def _timed(fn, buffer):
+    perf_counter = time.perf_counter
+    add = buffer.add
+
+    def wrapper(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            add(perf_counter() - start)
+
+    return wrapper
+
+
+class Profiler:
+    """
+    Times methods of live objects.
+    Enabling shadows each method with a timing wrapper on the instance, disabling deletes the
+    wrapper again, so a disabled profiler leaves the normal method lookup without any extra cost.
+    Objects with __slots__ cannot shadow a method, those are wrapped on their class and the
+    original method is put back when disabling.
+    """
+
+    def __init__(self, size=PROFILE_SAMPLES):
+        self.size = size
+        self.enabled = False
+        self.targets = []
+        self.buffers = {}
+        # (class, method) -> original function of methods wrapped on the class
+        self.originals = {}
+
+    def add_target(self, name, obj, method):
+        """Register `obj.method` under `name`, it is instrumented while the profiler is enabled"""
+        self.targets.append((name, obj, method))
+        if self.enabled:
+            self._wrap(name, obj, method)
+
+    def set_enabled(self, enabled):
+        if enabled == self.enabled:
+            return
+
+        self.enabled = enabled
+        for name, obj, method in self.targets:
+            if enabled:
+                self._wrap(name, obj, method)
+            elif (type(obj), method) in self.originals:
+                setattr(type(obj), method, self.originals.pop((type(obj), method)))
+            elif method in vars(obj):
+                delattr(obj, method)
+
+        if not enabled:
+            self.buffers = {}
+
+    def _wrap(self, name, obj, method):
+        if name not in self.buffers:
+            self.buffers[name] = TimingBuffer(self.size)
+        cls = type(obj)
+        if not hasattr(obj, '__dict__'):
+            original = self.originals.setdefault((cls, method), getattr(cls, method))
+            setattr(cls, method, _timed(original, self.buffers[name]))
+            return
+
+        # look up the method on the class, the instance may already hold a wrapper
+        bound = getattr(cls, method).__get__(obj, cls)
+        setattr(obj, method, _timed(bound, self.buffers[name]))
+
+    def report(self):
+        """One line per hot path with p50/p99/max in microseconds, in registration order"""
+        lines = []
+        for name, _, _ in self.targets:
+            buffer = self.buffers.get(name)
+            if not buffer or not buffer.count:
+                continue
+            p50, p99, peak = buffer.summary()
+            lines.append('{:<16} {:>7.0f} {:>7.0f} {:>7.0f}'.format(name, p50 * 1e6, p99 * 1e6, peak * 1e6))
+
+        if not lines:
+            return ''
+        return '\n'.join(['{:<16} {:>7} {:>7} {:>7}'.format('us', 'p50', 'p99', 'max')] + lines)
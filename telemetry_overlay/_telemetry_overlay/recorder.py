@@ -0,0 +1,377 @@
+import mmap
+import os
+from array import array
+import queue
+import re
+import struct
+import threading
+import time
+
+from _telemetry_overlay.utils import console, console_exception, write_atomic
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+MAGIC = b'TOVR'
+VERSION = 2
+INDEX_MAGIC = b'TOVI'
+# magic, version, channel count, header size
+HEADER = struct.Struct('<4sHHI')
+# rows are packed into chunks on the update thread, the writer thread only receives whole chunks
+CHUNK_ROWS = 256
+MAX_PENDING_CHUNKS = 64
+# seconds between checks of the writer thread for a close that could not be queued
+CLOSE_POLL = 1.0
+# attempts to replace the index file, on Windows it cannot be replaced while a reader has it open
+INDEX_WRITE_ATTEMPTS = 5
+
+
+# index entry: lap, sector, first row, byte offset of the first row
+INDEX_ENTRY = struct.Struct('<iiIQ')
+ROW_FIELDS = [
+    ('timestamp', 'd'),
+    ('packet_id', 'i'),
+    ('lap', 'h'),
+    ('sector', 'b'),
+    ('lap_time', 'i'),
+    ('position', 'f'),
+]
+
+
+def row_struct(channel_count):
+    """
+    Row layout: float64 timestamp, int32 packetId, int16 completed laps, int8 sector,
+    int32 current lap time in ms, float32 normalized track position, one float32 per channel
+    """
+    return struct.Struct('<' + ''.join(code for _, code in ROW_FIELDS) + 'f' * channel_count)
+
+
+def index_path(path):
+    return path + '.idx'
+
+
+def encode_index(entries, rows):
+    """Index file: magic, number of rows covered, then one entry per lap/sector boundary"""
+    return INDEX_MAGIC + struct.pack('<I', rows) + b''.join(INDEX_ENTRY.pack(*entry) for entry in entries)
+
+
+def encode_header(channels):
+    names = b''.join(struct.pack('<B', len(n)) + n for n in [name.encode('utf-8') for name in channels])
+    return HEADER.pack(MAGIC, VERSION, len(channels), HEADER.size + len(names)) + names
+
+
+class Recorder:
+    """
+    Appends fixed width telemetry rows to a binary recording.
+    record() only packs the row into the current chunk; full chunks are handed to a background
+    writer thread through a bounded queue. When the queue is full the chunk is dropped and counted
+    in `dropped_rows`, the update thread never waits for disk, closing included.
+    """
+
+    def __init__(self, path, channels):
+        self.path = path
+        self.channels = list(channels)
+        self.row = row_struct(len(self.channels))
+        self.rows = 0
+        self.dropped_rows = 0
+
+        self._chunk = bytearray()
+        self._chunk_rows = 0
+        self._queue = queue.Queue(MAX_PENDING_CHUNKS)
+        # set by close(), rows and index no longer change after it
+        self._closed = False
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        self._file = open(path, 'wb', buffering=CHUNK_ROWS * self.row.size)
+        self._file.write(encode_header(self.channels))
+        self.header_size = self._file.tell()
+
+        self.index = []
+        self._lap = -1
+        self._sector = -1
+
+        self._thread = threading.Thread(target=self._write_loop, name='telemetry recorder')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def record(self, timestamp, packet_id, lap, sector, lap_time, position, values):
+        if sector != self._sector or lap != self._lap:
+            self.index.append((lap, sector, self.rows, self.header_size + self.rows * self.row.size))
+            if lap != self._lap and self._lap != -1:
+                self._write_index()
+            self._lap = lap
+            self._sector = sector
+
+        self._chunk += self.row.pack(timestamp, packet_id, lap, sector, lap_time, position, *values)
+        self._chunk_rows += 1
+        self.rows += 1
+
+        if self._chunk_rows >= CHUNK_ROWS:
+            self.flush()
+
+    def flush(self):
+        """Hand the current chunk to the writer thread"""
+        if not self._chunk_rows:
+            return
+
+        try:
+            self._queue.put_nowait(bytes(self._chunk))
+        except queue.Full:
+            self.dropped_rows += self._chunk_rows
+            # keep row numbers and offsets in the index pointing at rows that are actually written
+            self.rows -= self._chunk_rows
+            self.index = [
+                entry if entry[2] <= self.rows else entry[:2] + (self.rows, self.header_size + self.rows * self.row.size)
+                for entry in self.index
+            ]
+
+        self._chunk = bytearray()
+        self._chunk_rows = 0
+
+    def close(self):
+        """
+        Flush pending rows and let the writer finish in the background,
+        it writes the final index once every queued chunk is on disk
+        """
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            # the writer notices the close once it drained the queue
+            pass
+
+    def wait(self, timeout=None):
+        """Block until the writer finished after close(), e.g. when the game shuts down"""
+        self._thread.join(timeout)
+
+    def _write_index(self):
+        """Queue a rewrite of the index file, it is written after the chunks queued before it"""
+        self.flush()
+        try:
+            self._queue.put_nowait((index_path(self.path), encode_index(self.index, self.rows)))
+        except queue.Full:
+            pass
+
+    def _write_loop(self):
+        try:
+            while True:
+                try:
+                    chunk = self._queue.get(timeout=CLOSE_POLL)
+                except queue.Empty:
+                    if self._closed:
+                        break
+                    continue
+                if chunk is None:
+                    break
+                if isinstance(chunk, tuple):
+                    self._file.flush()
+                    self._save_index(*chunk)
+                    continue
+                self._file.write(chunk)
+
+            self._file.flush()
+            self._save_index(index_path(self.path), encode_index(self.index, self.rows))
+        except Exception as e:
+            console_exception(e, 'Telemetry recorder failed')
+        finally:
+            self._file.close()
+
+    def _save_index(self, path, data):
+        """Replace the index atomically, a reader on another thread (the ghost loader) never sees it half written"""
+        for _ in range(INDEX_WRITE_ATTEMPTS):
+            try:
+                write_atomic(path, data)
+                return
+            except PermissionError:
+                time.sleep(0.05)
+        # readers rebuild the missing part from the rows, the next lap writes it again
+        console('index of', self.path, 'is in use, skipped this update')
+
+
+class Recording:
+    """
+    Memory mapped view of a recording.
+    Columns are returned as numpy arrays when numpy is available, otherwise as arrays from the array module.
+    Lap and sector lookups use the index file, so opening a recording is O(laps). Without a usable
+    index (e.g. the game crashed before it was written) the boundaries are rebuilt from the rows.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, channel_count, header_size = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('Not a telemetry recording: ' + path)
+
+        self.channels = []
+        offset = HEADER.size
+        for _ in range(channel_count):
+            length = self._mmap[offset]
+            self.channels.append(self._mmap[offset + 1:offset + 1 + length].decode('utf-8'))
+            offset += 1 + length
+
+        self.header_size = header_size
+        self.row = row_struct(channel_count)
+        self.rows = (len(self._mmap) - header_size) // self.row.size
+        self.columns = [name for name, _ in ROW_FIELDS] + self.channels
+
+        self._array = None
+        if numpy is not None:
+            dtype = numpy.dtype(
+                [(name, '<' + code) for name, code in ROW_FIELDS] + [(name, '<f4') for name in self.channels]
+            )
+            self._array = numpy.frombuffer(self._mmap, dtype=dtype, count=self.rows, offset=header_size)
+
+        self.index = self._read_index()
+        if self.index is None:
+            self.index = self._build_index()
+
+    def _read_index(self):
+        try:
+            with open(index_path(self.path), 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+
+        if data[:4] != INDEX_MAGIC:
+            return None
+
+        indexed_rows = struct.unpack_from('<I', data, 4)[0]
+        entries = [
+            INDEX_ENTRY.unpack_from(data, offset)
+            for offset in range(8, len(data) - INDEX_ENTRY.size + 1, INDEX_ENTRY.size)
+        ]
+        if indexed_rows == self.rows:
+            return entries
+
+        # index is behind the data, only scan the rows after it
+        if indexed_rows < self.rows and entries:
+            return entries + self._build_index(indexed_rows, entries[-1][:2])
+
+        return None
+
+    def _build_index(self, start=0, last=None):
+        entries = []
+        unpack_from = self.row.unpack_from
+        for row in range(start, self.rows):
+            values = unpack_from(self._mmap, self.offset(row))
+            lap_sector = (values[2], values[3])
+            if lap_sector != last:
+                entries.append((lap_sector[0], lap_sector[1], row, self.offset(row)))
+                last = lap_sector
+        return entries
+
+    def laps(self):
+        """Lap numbers (completed laps at the start of the lap) present in the recording"""
+        laps = []
+        for entry in self.index:
+            if not laps or laps[-1] != entry[0]:
+                laps.append(entry[0])
+        return laps
+
+    def segment(self, lap, sector=None):
+        """
+        Row range (start, stop) of a lap, or of one sector of that lap.
+        Returns None when the recording does not contain it.
+        """
+        start = None
+        for i, (entry_lap, entry_sector, row, _) in enumerate(self.index):
+            matches = entry_lap == lap and (sector is None or entry_sector == sector)
+            if matches and start is None:
+                start = row
+            elif not matches and start is not None:
+                return start, row
+
+        if start is None:
+            return None
+        return start, self.rows
+
+    def lap_column(self, name, lap, sector=None):
+        segment = self.segment(lap, sector)
+        if not segment:
+            return None
+        return self.column(name, segment[0], segment[1])
+
+    def offset(self, row):
+        """Byte offset of a row in the file"""
+        return self.header_size + row * self.row.size
+
+    def column(self, name, start=0, stop=None):
+        stop = self.rows if stop is None else min(stop, self.rows)
+        if self._array is not None:
+            return self._array[name][start:stop]
+
+        index = self.columns.index(name)
+        typecode = ROW_FIELDS[index][1] if index < len(ROW_FIELDS) else 'f'
+        unpack_from = self.row.unpack_from
+        return array(typecode, [unpack_from(self._mmap, self.offset(row))[index] for row in range(start, stop)])
+
+    def __getitem__(self, name):
+        return self.column(name)
+
+    def close(self):
+        self._array = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            # columns handed out still reference the mapping, it is released with them
+            pass
+        self._file.close()
+
+
+# start time and collision counter at the start of a recording file name
+RECORDING_NAME = re.compile(r'(\d{8}-\d{6})(?:-(\d+))?')
+
+
+def recording_path(directory, timestamp, tag=''):
+    """File name of a new recording, sortable by start time and ending with the session tag"""
+    name = time.strftime('%Y%m%d-%H%M%S', time.localtime(timestamp))
+    suffix = ('_' + tag if tag else '') + '.tovr'
+    path = os.path.join(directory, name + suffix)
+    i = 1
+    while os.path.exists(path):
+        path = os.path.join(directory, name + '-' + str(i) + suffix)
+        i += 1
+    return path
+
+
+def find_recordings(directory, tag=''):
+    """Recordings of a session tag, newest first"""
+    suffix = ('_' + tag if tag else '') + '.tovr'
+    try:
+        names = [name for name in os.listdir(directory) if name.endswith(suffix)]
+    except OSError:
+        return []
+
+    return [os.path.join(directory, name) for name in sorted(names, key=recording_order, reverse=True)]
+
+
+def recording_order(name):
+    """
+    Sort key of a recording file name: start time, then the counter of recordings started in
+    the same second. Plain string order puts "-1_tag" before "_tag", as '-' sorts before '_'.
+    """
+    match = RECORDING_NAME.match(name)
+    if not match:
+        return ('', 0)
+    return (match.group(1), int(match.group(2) or 0))
+
+
+def start_recorder(directory, timestamp, channels, tag=''):
+    try:
+        path = recording_path(directory, timestamp, tag)
+        console('recording telemetry to', path)
+        return Recorder(path, channels)
+    except Exception as e:
+        console_exception(e, 'Failed to start telemetry recorder', True)
+        return None
@@ -0,0 +1,53 @@
+class RateScheduler:
+    """
+    Fixed rate ticker driven by frame time.
+    Elapsed time is accumulated and whole periods are subtracted, so the average rate matches
+    the requested rate regardless of frame time jitter. When more than `max_catch_up` periods are
+    due at once (loading, alt-tab), the excess is dropped and counted in `dropped`.
+    """
+
+    def __init__(self, rate, max_catch_up=1):
+        self.max_catch_up = max_catch_up
+        self.set_rate(rate)
+
+    def set_rate(self, rate):
+        self.rate = rate
+        self.period = 1 / rate
+        self.timer = 0.0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.elapsed = 0.0
+        self.ticks = 0
+        self.dropped = 0
+
+    def advance(self, dt):
+        """Add frame time, returns the number of ticks due"""
+        self.elapsed += dt
+        self.timer += dt
+        if self.timer < self.period:
+            return 0
+
+        ticks = int(self.timer / self.period)
+        self.timer -= ticks * self.period
+
+        if ticks > self.max_catch_up:
+            self.dropped += ticks - self.max_catch_up
+            ticks = self.max_catch_up
+
+        self.ticks += ticks
+        return ticks
+
+    def achieved_rate(self):
+        if not self.elapsed:
+            return 0.0
+
+        return self.ticks / self.elapsed
+
+    def stats(self):
+        return {
+            'requested': self.rate,
+            'achieved': round(self.achieved_rate(), 2),
+            'ticks': self.ticks,
+            'dropped': self.dropped,
+        }
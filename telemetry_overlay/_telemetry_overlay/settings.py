@@ -9,6 +9,8 @@ class SettingsWindow:
         self.app = app
         self.open = False
         self._handlers = []
+        # (option, widget, scale) of every input showing a config option
+        self._bound = []
 
         self.window = ac.newApp("Telemetry Overlay Settings")
         ac.setTitle(self.window, "")
@@ -34,17 +36,18 @@ class SettingsWindow:
             x=10,
             y=10,
             btn_width=75,
-            btn_margin=15,
+            btn_margin=10,
         )
         self.general_tab = self.tabs.add_tab('General')
         self.traces_tab = self.tabs.add_tab('Traces')
         self.inputs_tab = self.tabs.add_tab('Inputs')
         self.wheel_tab = self.tabs.add_tab('Wheel')
+        self.profiles_tab = self.tabs.add_tab('Profiles')
         self.reset_tab = self.tabs.add_tab('Reset')
         self.tabs.set_active_tab(0)
 
         self.general_tab.mount(
-            Spinner(
+            self._bind('app_width', Spinner(
                 window=self.window,
                 label='Width',
                 label_top=True,
@@ -56,11 +59,11 @@ class SettingsWindow:
                 x=20,
                 y=70,
                 width=235,
-                onChange=self._add_handler(lambda value: self.config_change('app_width', value, True))
-            )
+                onChange=self._add_handler(lambda value: self.config_change('app_width', value))
+            ))
         )
         self.general_tab.mount(
-            Spinner(
+            self._bind('app_height', Spinner(
                 window=self.window,
                 label='Height',
                 label_top=True,
@@ -72,11 +75,11 @@ class SettingsWindow:
                 x=20,
                 y=130,
                 width=235,
-                onChange=self._add_handler(lambda value: self.config_change('app_height', value, True))
-            )
+                onChange=self._add_handler(lambda value: self.config_change('app_height', value))
+            ))
         )
         self.general_tab.mount(
-            Spinner(
+            self._bind('opacity', Spinner(
                 window=self.window,
                 label='Opacity',
                 label_top=True,
@@ -88,11 +91,11 @@ class SettingsWindow:
                 x=20,
                 y=190,
                 width=235,
-                onChange=self._add_handler(lambda value: self.config_change('opacity', value / 100, True))
-            )
+                onChange=self._add_handler(lambda value: self.config_change('opacity', value / 100))
+            ), scale=100)
         )
         self.general_tab.mount(
-            Spinner(
+            self._bind('sample_rate', Spinner(
                 window=self.window,
                 label='Sample rate (Hz)',
                 label_top=True,
@@ -104,11 +107,11 @@ class SettingsWindow:
                 x=275,
                 y=70,
                 width=235,
-                onChange=self._add_handler(lambda value: self.config_change('sample_rate', value, True))
-            )
+                onChange=self._add_handler(lambda value: self.config_change('sample_rate', value))
+            ))
         )
         self.general_tab.mount(
-            Spinner(
+            self._bind('denoise_g', Spinner(
                 window=self.window,
                 label='Denoise G traces',
                 label_top=True,
@@ -120,11 +123,11 @@ class SettingsWindow:
                 x=275,
                 y=130,
                 width=235,
-                onChange=self._add_handler(lambda value: self.config_change('denoise_g', value, True))
-            )
+                onChange=self._add_handler(lambda value: self.config_change('denoise_g', value))
+            ))
         )
         self.general_tab.mount(
-            Spinner(
+            self._bind('padding', Spinner(
                 window=self.window,
                 label='Padding',
                 label_top=True,
@@ -136,11 +139,11 @@ class SettingsWindow:
                 x=20,
                 y=250,
                 width=235,
-                onChange=self._add_handler(lambda value: self.config_change('padding', value, True))
-            )
+                onChange=self._add_handler(lambda value: self.config_change('padding', value))
+            ))
         )
         self.general_tab.mount(
-            Spinner(
+            self._bind('trace_size', Spinner(
                 window=self.window,
                 label='Trace size',
                 label_top=True,
@@ -152,11 +155,11 @@ class SettingsWindow:
                 x=275,
                 y=190,
                 width=235,
-                onChange=self._add_handler(lambda value: self.config_change('trace_size', value, True)),
-            )
+                onChange=self._add_handler(lambda value: self.config_change('trace_size', value)),
+            ))
         )
         self.general_tab.mount(
-            Spinner(
+            self._bind('steering_sensitivity', Spinner(
                 window=self.window,
                 label='Steering trace sensitivity °',
                 label_top=True,
@@ -168,12 +171,12 @@ class SettingsWindow:
                 x=275,
                 y=250,
                 width=235,
-                onChange=self._add_handler(lambda value: self.config_change('steering_sensitivity', value, True)),
-            )
+                onChange=self._add_handler(lambda value: self.config_change('steering_sensitivity', value)),
+            ))
         )
         
         self.general_tab.mount(
-            Checkbox(
+            self._bind('open_settings_click', Checkbox(
                 window=self.window,
                 label='Open settings on window click',
                 value=self.app.config.open_settings_click,
@@ -181,10 +184,10 @@ class SettingsWindow:
                 y=300,
                 onChange=self._add_handler(
                     lambda *args: self.config_change('open_settings_click', not self.app.config.open_settings_click))
-            )
+            ))
         )
         self.general_tab.mount(
-            Checkbox(
+            self._bind('show_graph_lines', Checkbox(
                 window=self.window,
                 label='Horizontal graph lines',
                 value=self.app.config.show_graph_lines,
@@ -192,18 +195,54 @@ class SettingsWindow:
                 y=330,
                 onChange=self._add_handler(
                     lambda *args: self.config_change('show_graph_lines', not self.app.config.show_graph_lines))
-            )
+            ))
         )
         self.general_tab.mount(
-            Checkbox(
+            self._bind('show_telemetry_label', Checkbox(
                 window=self.window,
                 label='Telemetry label',
                 value=self.app.config.show_telemetry_label,
                 x=20,
                 y=360,
                 onChange=self._add_handler(
-                    lambda *args: self.config_change('show_telemetry_label', not self.app.config.show_telemetry_label, True))
-            )
+                    lambda *args: self.config_change('show_telemetry_label', not self.app.config.show_telemetry_label))
+            ))
+        )
+        self.general_tab.mount(
+            self._bind('use_shared_memory', Checkbox(
+                window=self.window,
+                label='Read from shared memory',
+                value=self.app.config.use_shared_memory,
+                x=275,
+                y=300,
+                onChange=self._add_handler(
+                    lambda *args: self.config_change('use_shared_memory', not self.app.config.use_shared_memory))
+            ))
+        )
+
+        def on_record_change(*args):
+            self.config_change('record_telemetry', not self.app.config.record_telemetry)
+
+        self.general_tab.mount(
+            self._bind('record_telemetry', Checkbox(
+                window=self.window,
+                label='Record telemetry',
+                value=self.app.config.record_telemetry,
+                x=275,
+                y=330,
+                onChange=self._add_handler(on_record_change)
+            ))
+        )
+        self.general_tab.mount(
+            self._bind('show_profiler', Checkbox(
+                window=self.window,
+                label='Profiler readout',
+                value=self.app.config.show_profiler,
+                x=275,
+                y=360,
+                onChange=self._add_handler(
+                    lambda *args: self.config_change('show_profiler', not self.app.config.show_profiler))
+            ))
         )
 
         self._create_trace_components('throttle', 65, 'Throttle trace', True)
@@ -216,100 +255,126 @@ class SettingsWindow:
         if self.app.IS_CSP:
             self._create_trace_components('handbrake', 310, 'Handbrake')
 
+            def on_ghost_change(*args):
+                self.config_change('show_ghost', not self.app.config.show_ghost)
+
+            self.traces_tab.mount(
+                self._bind('show_ghost', Checkbox(
+                    window=self.window,
+                    label='Best lap ghost',
+                    value=self.app.config.show_ghost,
+                    x=20,
+                    y=345,
+                    onChange=self._add_handler(on_ghost_change),
+                ))
+            )
+        else:
+            self.traces_tab.mount(
+                self._bind('drawn_graph', Checkbox(
+                    window=self.window,
+                    label='Draw traces (thick, more CPU)',
+                    value=self.app.config.drawn_graph,
+                    x=20,
+                    y=310,
+                    onChange=self._add_handler(
+                        lambda *args: self.config_change('drawn_graph', not self.app.config.drawn_graph)),
+                ))
+            )
+
         self.inputs_tab.mount(
-            Checkbox(
+            self._bind('show_throttle_bar', Checkbox(
                 window=self.window,
                 label='Throttle',
                 value=self.app.config.show_throttle_bar,
                 x=20,
                 y=50,
-                onChange=self._add_handler(lambda *args: self.config_change('show_throttle_bar', not self.app.config.show_throttle_bar, True)),
-            )
+                onChange=self._add_handler(lambda *args: self.config_change('show_throttle_bar', not self.app.config.show_throttle_bar)),
+            ))
         )
         self.inputs_tab.mount(
-            Checkbox(
+            self._bind('show_brake_bar', Checkbox(
                 window=self.window,
                 label='Brake',
                 value=self.app.config.show_brake_bar,
                 x=20,
                 y=80,
-                onChange=self._add_handler(lambda *args: self.config_change('show_brake_bar', not self.app.config.show_brake_bar, True)),
-            )
+                onChange=self._add_handler(lambda *args: self.config_change('show_brake_bar', not self.app.config.show_brake_bar)),
+            ))
         )
         self.inputs_tab.mount(
-            Checkbox(
+            self._bind('show_clutch_bar', Checkbox(
                 window=self.window,
                 label='Clutch',
                 value=self.app.config.show_clutch_bar,
                 x=20,
                 y=110,
-                onChange=self._add_handler(lambda *args: self.config_change('show_clutch_bar', not self.app.config.show_clutch_bar, True)),
-            )
+                onChange=self._add_handler(lambda *args: self.config_change('show_clutch_bar', not self.app.config.show_clutch_bar)),
+            ))
         )
         self.inputs_tab.mount(
-            Checkbox(
+            self._bind('show_ffb_bar', Checkbox(
                 window=self.window,
                 label='Force feedback',
                 value=self.app.config.show_ffb_bar,
                 x=20,
                 y=140,
-                onChange=self._add_handler(lambda *args: self.config_change('show_ffb_bar', not self.app.config.show_ffb_bar, True)),
-            )
+                onChange=self._add_handler(lambda *args: self.config_change('show_ffb_bar', not self.app.config.show_ffb_bar)),
+            ))
         )
         if self.app.IS_CSP:
             self.inputs_tab.mount(
-                Checkbox(
+                self._bind('show_handbrake_bar', Checkbox(
                     window=self.window,
                     label='Handbrake',
                     value=self.app.config.show_handbrake_bar,
                     x=20,
                     y=170,
-                    onChange=self._add_handler(lambda *args: self.config_change('show_handbrake_bar', not self.app.config.show_handbrake_bar, True)),
-                )
+                    onChange=self._add_handler(lambda *args: self.config_change('show_handbrake_bar', not self.app.config.show_handbrake_bar)),
+                ))
             )
 
         self.inputs_tab.mount(
-            Checkbox(
+            self._bind('show_bar_value', Checkbox(
                 window=self.window,
                 label='Show input value above bar',
                 value=self.app.config.show_bar_value,
                 x=20,
                 y=210,
-                onChange=self._add_handler(lambda *args: self.config_change('show_bar_value', not self.app.config.show_bar_value, True)),
-            )
+                onChange=self._add_handler(lambda *args: self.config_change('show_bar_value', not self.app.config.show_bar_value)),
+            ))
         )
         self.inputs_tab.mount(
-            Checkbox(
+            self._bind('pedals_end_stop', Checkbox(
                 window=self.window,
                 label='End stop',
                 value=self.app.config.pedals_end_stop,
                 x=20,
                 y=240,
-                onChange=self._add_handler(lambda *args: self.config_change('pedals_end_stop', not self.app.config.pedals_end_stop, True)),
-            )
+                onChange=self._add_handler(lambda *args: self.config_change('pedals_end_stop', not self.app.config.pedals_end_stop)),
+            ))
         )
         self.inputs_tab.mount(
-            Checkbox(
+            self._bind('pedals_base_stop', Checkbox(
                 window=self.window,
                 label='Base stop',
                 value=self.app.config.pedals_base_stop,
                 x=20,
                 y=270,
-                onChange=self._add_handler(lambda *args: self.config_change('pedals_base_stop', not self.app.config.pedals_base_stop, True)),
-            )
+                onChange=self._add_handler(lambda *args: self.config_change('pedals_base_stop', not self.app.config.pedals_base_stop)),
+            ))
         )
         self.inputs_tab.mount(
-            Checkbox(
+            self._bind('ffb_flash_on_clip', Checkbox(
                 window=self.window,
                 label='Flash red when force feedback is clipping',
                 value=self.app.config.ffb_flash_on_clip,
                 x=20,
                 y=300,
-                onChange=self._add_handler(lambda *args: self.config_change('ffb_flash_on_clip', not self.app.config.ffb_flash_on_clip, True)),
-            )
+                onChange=self._add_handler(lambda *args: self.config_change('ffb_flash_on_clip', not self.app.config.ffb_flash_on_clip)),
+            ))
         )
         self.inputs_tab.mount(
-            Spinner(
+            self._bind('bar_width', Spinner(
                 window=self.window,
                 label='Bar width',
                 label_top=True,
@@ -321,22 +386,38 @@ class SettingsWindow:
                 x=275,
                 y=65,
                 width=235,
-                onChange=self._add_handler(lambda value: self.config_change('bar_width', value, True))
-            )
+                onChange=self._add_handler(lambda value: self.config_change('bar_width', value))
+            ))
+        )
+        self.inputs_tab.mount(
+            self._bind('text_refresh_rate', Spinner(
+                window=self.window,
+                label='Value refresh rate (Hz)',
+                label_top=True,
+                label_align='center',
+                value=self.app.config.text_refresh_rate,
+                min=1,
+                max=60,
+                step=1,
+                x=275,
+                y=125,
+                width=235,
+                onChange=self._add_handler(lambda value: self.config_change('text_refresh_rate', value))
+            ))
         )
 
         self.wheel_tab.mount(
-            Checkbox(
+            self._bind('show_wheel', Checkbox(
                 window=self.window,
                 label='Show wheel',
                 value=self.app.config.show_wheel,
                 x=20,
                 y=50,
-                onChange=self._add_handler(lambda *args: self.config_change('show_wheel', not self.app.config.show_wheel, True)),
-            )
+                onChange=self._add_handler(lambda *args: self.config_change('show_wheel', not self.app.config.show_wheel)),
+            ))
         )
         self.wheel_tab.mount(
-            Spinner(
+            self._bind('wheel_depth', Spinner(
                 window=self.window,
                 label='Wheel thickness',
                 label_top=True,
@@ -348,11 +429,11 @@ class SettingsWindow:
                 x=275,
                 y=65,
                 width=235,
-                onChange=self._add_handler(lambda value: self.config_change('wheel_depth', value, True))
-            )
+                onChange=self._add_handler(lambda value: self.config_change('wheel_depth', value))
+            ))
         )
         self.wheel_tab.mount(
-            Spinner(
+            self._bind('wheel_angle', Spinner(
                 window=self.window,
                 label='Wheel width',
                 label_top=True,
@@ -364,39 +445,49 @@ class SettingsWindow:
                 x=275,
                 y=125,
                 width=235,
-                onChange=self._add_handler(lambda value: self.config_change('wheel_angle', value, True))
-            )
+                onChange=self._add_handler(lambda value: self.config_change('wheel_angle', value))
+            ))
         )
         if self.app.IS_CSP:
             self.wheel_tab.mount(
-                Checkbox(
+                self._bind('wheel_show_gear', Checkbox(
                     window=self.window,
                     label='Gear',
                     value=self.app.config.wheel_show_gear,
                     x=20,
                     y=80,
-                    onChange=self._add_handler(lambda *args: self.config_change('wheel_show_gear', not self.app.config.wheel_show_gear, True)),
-                )
+                    onChange=self._add_handler(lambda *args: self.config_change('wheel_show_gear', not self.app.config.wheel_show_gear)),
+                ))
             )
             self.wheel_tab.mount(
-                Checkbox(
+                self._bind('wheel_show_speed', Checkbox(
                     window=self.window,
                     label='Speed',
                     value=self.app.config.wheel_show_speed,
                     x=20,
                     y=110,
-                    onChange=self._add_handler(lambda *args: self.config_change('wheel_show_speed', not self.app.config.wheel_show_speed, True)),
-                )
+                    onChange=self._add_handler(lambda *args: self.config_change('wheel_show_speed', not self.app.config.wheel_show_speed)),
+                ))
             )
             self.wheel_tab.mount(
-                Checkbox(
+                self._bind('metric', Checkbox(
                     window=self.window,
                     label='Metric',
                     value=self.app.config.metric,
                     x=20,
                     y=140,
-                    onChange=self._add_handler(lambda *args: self.config_change('metric', not self.app.config.metric, True)),
-                )
+                    onChange=self._add_handler(lambda *args: self.config_change('metric', not self.app.config.metric)),
+                ))
+            )
+            self.wheel_tab.mount(
+                self._bind('wheel_show_delta', Checkbox(
+                    window=self.window,
+                    label='Delta to best lap',
+                    value=self.app.config.wheel_show_delta,
+                    x=20,
+                    y=170,
+                    onChange=self._add_handler(lambda *args: self.config_change('wheel_show_delta', not self.app.config.wheel_show_delta)),
+                ))
             )
 
 
@@ -415,16 +506,33 @@ class SettingsWindow:
             )
         )
 
+        self._create_profile_components()
+        self.app.config.listeners.append(self.on_config_change)
+
     def set_open(self, open):
         ac.setVisible(self.window, 1 if open else 0)
         self.open = open
 
-    def config_change(self, attribute, value, redraw_app=False):
-        setattr(self.app.config, attribute, value)
-        self.app.config.update_cfg = True
-        
-        if redraw_app:
-            self.app.apply_config()
+    def config_change(self, attribute, value):
+        # the app rebuilds whatever the option invalidates through its config listener
+        self.app.config.set(attribute, value)
+
+    def on_config_change(self, option, changes):
+        # a profile switch changes options behind the inputs
+        if option is None:
+            self.refresh()
+
+    def refresh(self):
+        """Show the current config values in the inputs"""
+        for option, widget, scale in self._bound:
+            value = getattr(self.app.config, option)
+            widget.set_value(value * scale if scale != 1 else value)
+        ac.setText(self.profile_button, self.app.config.profile)
+
+    def _bind(self, option, widget, scale=1):
+        """Register an input showing `option`, refreshed on profile switches"""
+        self._bound.append((option, widget, scale))
+        return widget
     
     def _add_handler(self, handler):
         """
@@ -440,36 +548,86 @@ class SettingsWindow:
 
         def on_enabled_change(*args):
             self.config_change(show_name, not getattr(self.app.config, show_name))
-
-            if not self.app.IS_CSP:
-                if self.app.ac_graph_traces[trace]:
-                    self.app.ac_graph_traces[trace].remove()
-                    self.app.ac_graph_traces[trace] = None
-                else:
-                    self.app.ac_graph_traces[trace] = self.app.ac_graph.add_trace(getattr(self.app.config, trace + '_color'))
         
         def on_color_change(value):
             self.config_change(color_name, value)
-            if not self.app.IS_CSP and self.app.ac_graph_traces[trace]:
-                self.app.ac_graph_traces[trace].update_color(value)
 
         self.traces_tab.mount(
-            Checkbox(
+            self._bind(show_name, Checkbox(
                 window=self.window,
                 label=label,
                 value=getattr(self.app.config, show_name),
                 x=20,
                 y=y,
                 onChange=self._add_handler(on_enabled_change),
-            )
+            ))
         )
         self.traces_tab.mount(
-            RGBAInput(
+            self._bind(color_name, RGBAInput(
                 window=self.window,
                 x=160,
                 y=y - 3,
                 value=getattr(self.app.config, color_name),
                 onChange=self._add_handler(on_color_change),
                 show_labels=show_color_labels
+            ))
+        )
+
+    def _create_profile_components(self):
+        config = self.app.config
+
+        label = ac.addLabel(self.window, 'Profile')
+        ac.setPosition(label, 20, 52)
+        ac.setFontSize(label, 16)
+        self.profiles_tab.mount(label)
+
+        # click switches to the next profile
+        self.profile_button = ac.addButton(self.window, config.profile)
+        ac.setPosition(self.profile_button, 100, 50)
+        ac.setSize(self.profile_button, 200, 22)
+        ac.drawBorder(self.profile_button, 0)
+        ac.addOnClickedListener(self.profile_button, self._add_handler(lambda *args: self.app.cycle_profile()))
+        self.profiles_tab.mount(self.profile_button)
+
+        def on_new_profile(*args):
+            number = len(config.profiles) + 1
+            while 'profile {}'.format(number) in config.profiles:
+                number += 1
+            config.add_profile('profile {}'.format(number))
+
+        new_button = ac.addButton(self.window, 'new profile')
+        ac.setPosition(new_button, 20, 90)
+        ac.setSize(new_button, 100, 22)
+        ac.drawBorder(new_button, 0)
+        ac.addOnClickedListener(new_button, self._add_handler(on_new_profile))
+        self.profiles_tab.mount(new_button)
+
+        def on_delete_profile():
+            config.remove_profile(config.profile)
+
+        self.profiles_tab.mount(
+            ConfirmButton(
+                window=self.window,
+                x=20,
+                y=130,
+                text='delete profile',
+                confirm_text='delete',
+                on_confirm=on_delete_profile,
             )
         )
+        self.profiles_tab.mount(
+            self._bind('cycle_profile_click', Checkbox(
+                window=self.window,
+                label='Next profile on clicking right side of the graph',
+                value=config.cycle_profile_click,
+                x=20,
+                y=180,
+                onChange=self._add_handler(
+                    lambda *args: self.config_change('cycle_profile_click', not self.app.config.cycle_profile_click))
+            ))
+        )
+
+        hint = ac.addLabel(self.window, 'Profiles are [PROFILE <name>] sections of config.ini, rename them there')
+        ac.setPosition(hint, 20, 220)
+        ac.setFontSize(hint, 12)
+        self.profiles_tab.mount(hint)
@@ -0,0 +1,69 @@
+import ac
+
+from _telemetry_overlay.utils import console_exception, draw_render_target
+
+# labels can start slightly above the app window, e.g. pedal values with no padding
+TEXT_MARGIN = 20
+
+
+class TextLayer:
+    """
+    Labels of the app drawn into a CSP render target.
+    update() only re-renders the target when the labels differ from the ones already in it,
+    every frame render() draws the whole layer as a single textured quad.
+    """
+    def __init__(self):
+        self.target = 0
+        self.font = ac.ext_glFontCreate('roboto', 1, 1, 1)
+        self.x = 0
+        self.y = 0
+        self.width = 0
+        self.height = 0
+        self.labels = None
+
+    def setup(self, width, height):
+        """Size the layer to the app window, forces a re-render on the next update"""
+        width = int(width)
+        height = int(height) + TEXT_MARGIN
+        self.labels = None
+        if self.target and (width, height) == (self.width, self.height):
+            return True
+
+        try:
+            if self.target:
+                ac.ext_disposeRenderTarget(self.target)
+                self.target = 0
+
+            self.y = -TEXT_MARGIN
+            self.width = width
+            self.height = height
+            self.target = ac.ext_createRenderTarget(width, height, False)
+            return True
+        except Exception as e:
+            console_exception(e, 'Failed to create CSP text render target', True)
+            return False
+
+    def update(self, labels):
+        """
+        Set the labels, a list of (text, x, y, size, color) in app window coordinates.
+        Labels are drawn centered on x.
+        """
+        if not self.target or labels == self.labels:
+            return
+
+        self.labels = labels
+        ac.ext_clearRenderTarget(self.target)
+        ac.ext_bindRenderTarget(self.target)
+        current_color = None
+        for text, x, y, size, color in labels:
+            if color != current_color:
+                ac.ext_glFontColor(self.font, color)
+                current_color = color
+            ac.ext_glFontUse(self.font, text, (x - self.x, y - self.y), size, 2)
+        ac.ext_restoreRenderTarget()
+
+    def render(self):
+        if not self.target or not self.labels:
+            return
+
+        draw_render_target(self.target, self.x, self.y, self.width, self.height)
@@ -1,4 +1,4 @@
-import ac
+import ac, acsys
 import traceback
 import os
 
@@ -20,6 +20,35 @@ def console_exception(exception, description = 'Caught exception', log = False):
         ac.log(trace)
 
 
+# ac calls made by draw_render_target, drawing a render target only pays off above this
+DRAW_RENDER_TARGET_CALLS = 8
+
+
+def draw_render_target(target, x, y, width, height):
+    """Draw a whole CSP render target as one textured quad"""
+    ac.glBegin(acsys.GL.Quads)
+    ac.glColor4f(1, 1, 1, 1)
+    ac.ext_glSetTexture(target, 0)
+    ac.ext_glVertexTex(x, y, 0, 0)
+    ac.ext_glVertexTex(x, y + height, 0, 1)
+    ac.ext_glVertexTex(x + width, y + height, 1, 1)
+    ac.ext_glVertexTex(x + width, y, 1, 0)
+    ac.glEnd()
+
+
+def write_atomic(path, data):
+    """
+    Write `data` (text or bytes) through a temp file next to `path`. A crash mid-write leaves the
+    old file intact and readers never see a partially written file.
+    """
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb' if isinstance(data, bytes) else 'w') as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+
 def get_path(path):
     curr_dir = os.path.dirname(__file__)
     return os.path.join(curr_dir, path)
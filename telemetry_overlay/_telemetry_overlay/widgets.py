@@ -1,6 +1,8 @@
 import ac, acsys
 
 import math
+from array import array
+from collections import deque
 from _telemetry_overlay.data import TelemetryData
 from _telemetry_overlay.utils import console_exception, load_texture
 
@@ -10,6 +12,30 @@ SPINNER_WIDTH = 150
 SPINNER_HEIGHT = 22
 SPINNER_LABEL_GAP = 10
 
+# wheel marker angles are quantized to 0.1°, sin and cos are looked up instead of computed
+TRIG_STEPS = 3600
+TRIG_SIN = array('d', [math.sin(math.radians(i * 360 / TRIG_STEPS)) for i in range(TRIG_STEPS)])
+TRIG_COS = array('d', [math.cos(math.radians(i * 360 / TRIG_STEPS)) for i in range(TRIG_STEPS)])
+
+# bar background color, alpha is the app opacity
+BAR_BACKGROUND = (0.24, 0.24, 0.24)
+
+# history entries of a CSP graph channel that was not sampled yet
+NAN = float('nan')
+
+# pedal value labels by percentage, '00' stands for 100 to keep the label two digits wide
+VALUE_TEXTS = [str(i) for i in range(100)] + ['00']
+
+
+def value_text(value):
+    """Label text of a 0-1 input value"""
+    rounded = round(value * 100)
+    if rounded >= 100:
+        return VALUE_TEXTS[100]
+    if rounded <= 0:
+        return VALUE_TEXTS[0]
+    return VALUE_TEXTS[rounded]
+
 class BaseWidget:
     id = 0
 
@@ -94,7 +120,8 @@ class ConfirmButton(BaseWidget):
         if self.on_confirm:
             self.on_confirm()
         
-        self.set_visible(self.confirm_button, 0)
+        ac.setVisible(self.confirm_button, 0)
+        ac.setText(self.button, self.text)
         self.active = False
 
     def set_visible(self, visible=True):
@@ -301,7 +328,15 @@ class Tab:
 
 
 class ACGraph:
-    def __init__(self, window, x, y, width, height, trace_width = 1, opacity = 0.2):
+    """
+    Graph made of AC graph widgets, one widget per pixel of trace thickness.
+    Every trace keeps the values shown in the graph, so when the widgets have to be recreated
+    (AC graphs can not remove a series or change its color) the history is replayed into the new
+    widgets instead of blanking the graph. Removing or recoloring a trace only marks the graph
+    dirty, the widgets are rebuilt once by the next setup().
+    `bg_label` reuses the background label of a disposed graph of the same window.
+    """
+    def __init__(self, window, x, y, width, height, trace_width = 1, opacity = 0.2, bg_label = None):
         self.graphs = []
         self.window = window
         self.traces = []
@@ -311,19 +346,43 @@ class ACGraph:
         self.height = height
         self.trace_width = trace_width
         self.opacity = opacity
+        self.dirty = True
+        # geometry the widgets were created with
+        self._layout = None
 
-        self.bg_label = ac.addLabel(self.window, '')
+        self.bg_label = ac.addLabel(self.window, '') if bg_label is None else bg_label
         ac.setBackgroundColor(self.bg_label, 0.25, 0.25, 0.25)
         
         self.setup()
     
     def setup(self):
+        layout = (self.x, self.y, self.width, self.height, self.trace_width)
+        if self.dirty or layout != self._layout:
+            self._rebuild()
+            self._layout = layout
+            self.dirty = False
+        
+        ac.setPosition(self.bg_label, self.x, self.y)
+        ac.setSize(self.bg_label, self.width, self.height)
+        ac.setBackgroundOpacity(self.bg_label, self.opacity)
+        ac.setVisible(self.bg_label, 1)
+
+    def _rebuild(self):
         for graph in self.graphs:
             ac.setRange(graph, 0, 0, 0)
             ac.removeItem(self.window, graph)
 
         self.graphs = []
 
+        # oldest first, shorter histories are padded so all series stay aligned
+        histories = []
+        for i, trace in enumerate(self.traces):
+            trace._index = i
+            trace.resize(self.width)
+            histories.append(trace.latest())
+        length = max([len(history) for history in histories] or [0])
+        histories = [[history[0] if history else 0.0] * (length - len(history)) + history for history in histories]
+
         for i in range(self.trace_width):
             graph = ac.addGraph(self.window, '')
             ac.setRange(graph, 0.0, self.height, self.width)
@@ -334,20 +393,40 @@ class ACGraph:
             # ac.setBackgroundColor(graph, 0.25, 0.25, 0.25)
             # ac.setBackgroundOpacity(graph, self.opacity / self.trace_width)
 
-            for i, trace in enumerate(self.traces):
-                trace._index = i
+            for trace in self.traces:
                 ac.addSerieToGraph(graph, trace.color[0], trace.color[1], trace.color[2])
+
+            for index, history in enumerate(histories):
+                for value in history:
+                    ac.addValueToGraph(graph, index, value * self.height)
             
             self.graphs.append(graph)
-        
-        ac.setPosition(self.bg_label, self.x, self.y)
-        ac.setSize(self.bg_label, self.width, self.height)
-        ac.setBackgroundOpacity(self.bg_label, self.opacity)
 
-    def add_trace(self, color):
-        trace_index = len(self.traces)
-        trace = ACGraphTrace(self, color, trace_index)
-        self.traces.append(trace)
+    def dispose(self):
+        """Remove the graph widgets, e.g. when switching to the drawn graph"""
+        for graph in self.graphs:
+            ac.setRange(graph, 0, 0, 0)
+            ac.removeItem(self.window, graph)
+        self.graphs = []
+        self.traces = []
+        self._layout = None
+        ac.setVisible(self.bg_label, 0)
+
+    def add_trace(self, color, index=None):
+        """Add a trace at `index` of the draw order, last by default"""
+        if index is None or index >= len(self.traces):
+            index = len(self.traces)
+        else:
+            # series after it move up one index, the widgets have to be rebuilt
+            self.dirty = True
+        trace = ACGraphTrace(self, color, index)
+        self.traces.insert(index, trace)
+        if self.dirty:
+            # series indices of the widgets no longer match the traces, rebuild now
+            self.setup()
+            return trace
+
+        # a new series can be added to the existing widgets
         for graph in self.graphs:
             ac.addSerieToGraph(graph, color[0], color[1], color[2])
         
@@ -359,58 +438,469 @@ class ACGraphTrace:
         self._graph = graph
         self._index = trace_index
         self.color = color
+        # values shown in the graph, replayed when the widgets are recreated
+        self.history = array('f', [0.0]) * max(1, graph.width)
+        self.head = 0
+        self.count = 0
     
     def add_value(self, value):
         for graph in self._graph.graphs:
             ac.addValueToGraph(graph, self._index, value * self._graph.height)
+
+        history = self.history
+        history[self.head] = value
+        self.head += 1
+        if self.head == len(history):
+            self.head = 0
+        if self.count < len(history):
+            self.count += 1
+
+    def latest(self):
+        """Buffered values, oldest first"""
+        history = self.history
+        if self.count < len(history):
+            return history[:self.count].tolist()
+        return history[self.head:].tolist() + history[:self.head].tolist()
+
+    def resize(self, size):
+        """Change capacity, keeping the most recent values that still fit"""
+        size = max(1, size)
+        if size == len(self.history):
+            return
+
+        kept = self.latest()[-size:]
+        self.history = array('f', kept + [0.0] * (size - len(kept)))
+        self.head = len(kept) % size
+        self.count = len(kept)
     
+    def update_color(self, color):
+        if color == self.color:
+            return
+        self.color = color
+        self._graph.dirty = True
+
+    def remove(self):
+        self._graph.traces.remove(self)
+        self._graph.dirty = True
+
+
+# longest offset of a LineGraph join, in trace widths, sharper joins are cut off
+MITER_LIMIT = 2.0
+
+
+class LineGraph:
+    """
+    Graph for AC without CSP, drawn in the render callback instead of using AC graph widgets.
+    Traces keep a simplified polyline of their samples, one sample per pixel. The vertices are
+    built when a sample arrives, offset along the mitered normal of the polyline so steep
+    segments are as thick as flat ones, and render() only replays them: one line strip per pixel
+    of thickness, or quads from 4px on.
+    A sample costs a few arithmetic operations instead of one widget update per pixel of
+    thickness, and changing a trace color only changes the color used by the next render.
+    The cost moves to the render callback though: AC has no retained drawing, so every frame
+    replays all vertices, about one ac call per vertex and pixel of thickness below 4px
+    and four per segment above. Thicker traces are simplified more to keep that down.
+    """
+    def __init__(self, x, y, width, height, trace_width = 1):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.trace_width = trace_width
+        self.traces = []
+        self.setup()
+
+    def setup(self):
+        for trace in self.traces:
+            trace.trim()
+            trace.vertices = None
+
+    def add_trace(self, color, index=None):
+        """Add a trace at `index` of the draw order, last by default"""
+        trace = LineGraphTrace(self, color)
+        self.traces.insert(len(self.traces) if index is None else index, trace)
+        return trace
+
+    def dispose(self):
+        self.traces = []
+
+    def build_vertices(self, trace):
+        """
+        (xs, ys) arrays of the line strips (below 4px) or of the single quad list of `trace`,
+        in screen coordinates
+        """
+        points = trace.points
+        if len(points) < 2:
+            return []
+
+        trace_width = self.trace_width
+        half = trace_width / 2
+        bottom = self.y + self.height - half
+        scale = self.height - trace_width
+        left = self.x
+        right = self.x + self.width
+
+        newest = trace.samples
+        xs = [right - (newest - sample) for sample, _ in points]
+        ys = [bottom - value * scale for _, value in points]
+        if xs[0] < left:
+            # first segment starts left of the graph, cut it at the left edge
+            ys[0] += (ys[1] - ys[0]) * (left - xs[0]) / (xs[1] - xs[0])
+            xs[0] = left
+
+        if trace_width <= 1:
+            return [(array('f', xs), array('f', ys))]
+
+        # unit normal of every segment, x always grows so all normals point the same way
+        normals = []
+        for i in range(1, len(xs)):
+            dx = xs[i] - xs[i - 1]
+            dy = ys[i] - ys[i - 1]
+            length = math.hypot(dx, dy)
+            normals.append((dy / length, -dx / length))
+
+        # per vertex offset of a unit distance from the polyline, mitered at the joins
+        miters = [normals[0]]
+        for (ax, ay), (bx, by) in zip(normals, normals[1:]):
+            mx = ax + bx
+            my = ay + by
+            length_sq = mx * mx + my * my
+            # miter length is 2 / |a + b|, capped for sharp joins
+            factor = 2 / length_sq if length_sq * MITER_LIMIT * MITER_LIMIT >= 4 else MITER_LIMIT / math.sqrt(length_sq)
+            miters.append((mx * factor, my * factor))
+        miters.append(normals[-1])
+
+        if trace_width < 4:
+            strips = []
+            for offset in range(trace_width):
+                offset -= (trace_width - 1) / 2
+                strips.append((
+                    array('f', [x + mx * offset for x, (mx, _) in zip(xs, miters)]),
+                    array('f', [y + my * offset for y, (_, my) in zip(ys, miters)]),
+                ))
+            return strips
+
+        quad_xs = array('f')
+        quad_ys = array('f')
+        for i in range(1, len(xs)):
+            (ax, ay), (bx, by) = miters[i - 1], miters[i]
+            quad_xs.extend((xs[i - 1] - ax * half, xs[i - 1] + ax * half, xs[i] + bx * half, xs[i] - bx * half))
+            quad_ys.extend((ys[i - 1] - ay * half, ys[i - 1] + ay * half, ys[i] + by * half, ys[i] - by * half))
+        return [(quad_xs, quad_ys)]
+
+    def render(self):
+        vertex = ac.glVertex2f
+        mode = acsys.GL.LineStrip if self.trace_width < 4 else acsys.GL.Quads
+
+        for trace in self.traces:
+            strips = trace.vertices
+            if strips is None:
+                strips = trace.vertices = self.build_vertices(trace)
+
+            color = trace.color
+            for xs, ys in strips:
+                ac.glBegin(mode)
+                ac.glColor4f(color[0], color[1], color[2], color[3])
+                for x, y in zip(xs, ys):
+                    vertex(x, y)
+                ac.glEnd()
+
+
+class LineGraphTrace:
+    """
+    Samples of a trace as a polyline, simplified while sampling.
+    A new sample extends the last segment as long as the segment stays within half a pixel,
+    or a quarter of the trace width when that is larger, of every sample it replaces (tracked
+    as a cone of allowed slopes), so flat or straight parts of a trace are drawn with a single
+    segment.
+    """
+    __slots__ = ('_graph', 'color', 'points', 'samples', 'slope_min', 'slope_max', 'vertices')
+
+    def __init__(self, graph, color):
+        self._graph = graph
+        self.color = color
+        # (sample number, value) of the polyline vertices, oldest first
+        self.points = deque()
+        self.samples = 0
+        self.slope_min = 0.0
+        self.slope_max = 0.0
+        # screen vertices built by the graph, None until the next render after a change
+        self.vertices = None
+
+    def add_value(self, value):
+        self.vertices = None
+        self.samples += 1
+        sample = self.samples
+        points = self.points
+        # a thick trace hides deviations well below its width
+        tolerance = max(0.5, self._graph.trace_width / 4) / max(1, self._graph.height)
+
+        if len(points) >= 2:
+            anchor_sample, anchor_value = points[-2]
+            steps = sample - anchor_sample
+            slope = (value - anchor_value) / steps
+            if self.slope_min <= slope <= self.slope_max:
+                points[-1] = (sample, value)
+                self.slope_min = max(self.slope_min, (value - tolerance - anchor_value) / steps)
+                self.slope_max = min(self.slope_max, (value + tolerance - anchor_value) / steps)
+                self.trim()
+                return
+
+        if points:
+            anchor_sample, anchor_value = points[-1]
+            steps = sample - anchor_sample
+            self.slope_min = (value - tolerance - anchor_value) / steps
+            self.slope_max = (value + tolerance - anchor_value) / steps
+        points.append((sample, value))
+        self.trim()
+
+    def trim(self):
+        """Drop vertices of segments that scrolled out of the graph"""
+        points = self.points
+        first_visible = self.samples - self._graph.width
+        while len(points) > 2 and points[1][0] <= first_visible:
+            points.popleft()
+
     def update_color(self, color):
         self.color = color
-        self._graph.setup()
 
     def remove(self):
         self._graph.traces.remove(self)
-        self._graph.setup()
 
 
 class CSPGraph:
-    def __init__(self, x, y, width, height, trace_width = 1):
+    """
+    Scrolling graph drawn into a CSP render target.
+
+    In ring buffer mode (default) the texture is used as a circular buffer: every sample only
+    overwrites the column at the write head, and render() draws the texture as two quads
+    starting at the oldest column. Per sample cost is O(traces) instead of O(area).
+    Shift mode copies the whole target 1px to the left through a second target for every sample.
+
+    The sampled values of every channel are also kept in a float ring as wide as the graph, so a
+    resize, a new trace size or a color change redraws the history instead of blanking the graph.
+    """
+    def __init__(self, x, y, width, height, trace_width = 1, ring_buffer = True):
         self.x = x
         self.y = y
         self.trace_width = int(trace_width)
         self.width = width
         self.height = height + self.trace_width
+        self.ring_buffer = ring_buffer
 
         # main target for drawing lines
         self.render_target = 0
         # secondary target for temporarily storing left shifted version of main target
         self.shift_target = 0
+        # column of the next sample in ring buffer mode, also the oldest visible column
+        self.head = 0
+        # size the render targets were created with
+        self._target_size = None
+        self._trace_width = self.trace_width
+
+        # per channel value history, ring of `history_width` samples with the next one at `history_head`
+        self.names = []
+        self.colors = []
+        self.histories = []
+        self.history_width = width
+        self.history_head = 0
+        self.history_count = 0
     
     def setup(self):
+        """
+        (Re)create the render targets when the size changed and redraw the history into them.
+        A trace size change only redraws.
+        """
+        size = (self.width, self.height, self.ring_buffer)
+        if self.render_target and size == self._target_size:
+            if self.trace_width != self._trace_width:
+                self._trace_width = self.trace_width
+                self._rasterize()
+            return True
+
+        if self.width != self.history_width:
+            self._resize_history(self.width)
+
         try:
             if self.render_target:
                 ac.ext_disposeRenderTarget(self.render_target)
             if self.shift_target:
                 ac.ext_disposeRenderTarget(self.shift_target)
+                self.shift_target = 0
 
             # main target for drawing lines
             self.render_target = ac.ext_createRenderTarget(self.width, self.height, False)
-            # secondary target for temporarily storing left shifted version of main target
-            self.shift_target = ac.ext_createRenderTarget(self.width, self.height, False)
+            if not self.ring_buffer:
+                # secondary target for temporarily storing left shifted version of main target
+                self.shift_target = ac.ext_createRenderTarget(self.width, self.height, False)
+            self.head = 0
+            self._target_size = size
+            self._trace_width = self.trace_width
+            self._rasterize()
 
             return True
         except Exception as e:
             console_exception(e, 'Failed to create CSP render targets', True)
             return False
 
+    def set_channels(self, names, colors):
+        """
+        Name and color of each value in the next columns, in order. Channels that stay keep their
+        history, the graph is redrawn once when a channel was removed or recolored.
+        """
+        previous = dict(zip(self.names, zip(self.histories, self.colors)))
+        redraw = False
+        histories = []
+        for name, color in zip(names, colors):
+            if name in previous:
+                history, previous_color = previous.pop(name)
+                redraw = redraw or color != previous_color
+            else:
+                history = array('f', [NAN]) * self.history_width
+            histories.append(history)
+
+        self.names = list(names)
+        self.colors = list(colors)
+        self.histories = histories
+        if (redraw or previous) and self.render_target:
+            self._rasterize()
+
+    def _record(self, columns):
+        histories = self.histories
+        if len(columns[0]) != len(histories):
+            # values without set_channels(), kept by position
+            self.set_channels(range(len(columns[0])), [color for _, _, color in columns[0]])
+            histories = self.histories
+
+        head = self.history_head
+        for values in columns:
+            for history, (_, value, _) in zip(histories, values):
+                history[head] = value
+            head = (head + 1) % self.history_width
+        self.history_head = head
+        self.history_count = min(self.history_count + len(columns), self.history_width)
+
+    def _latest(self, history, count):
+        """Last `count` values of a history ring, oldest first"""
+        head = self.history_head
+        if count <= head:
+            return history[head - count:head]
+        return history[len(history) - (count - head):] + history[:head]
+
+    def _resize_history(self, width):
+        count = min(self.history_count, width)
+        histories = []
+        for history in self.histories:
+            resized = array('f', [NAN]) * width
+            resized[:count] = self._latest(history, count)
+            histories.append(resized)
+
+        self.histories = histories
+        self.history_width = width
+        self.history_count = count
+        self.history_head = count % width
+
+    def _rasterize(self):
+        """
+        Redraw the kept history into a cleared render target in one pass, newest sample at the
+        right edge. One quad batch per channel instead of a draw call per segment.
+        """
+        ac.ext_clearRenderTarget(self.render_target)
+        self.head = 0
+        count = self.history_count
+        if not count:
+            return
+
+        ac.ext_bindRenderTarget(self.render_target)
+        ac.ext_glSetBlendMode(0)
+        # right edge of the oldest sample, see _draw_column
+        start = self.width - count + 1
+        height = self.height
+        trace_width = self.trace_width
+        inner_height = height - trace_width
+        for history, color in zip(self.histories, self.colors):
+            ac.glColor4f(color[0], color[1], color[2], color[3])
+            ac.glBegin(acsys.GL.Quads)
+            prev = NAN
+            for x, value in enumerate(self._latest(history, count), start):
+                # not sampled yet, nothing to draw
+                if value != value:
+                    continue
+                if prev != prev:
+                    prev = value
+
+                if value > prev:
+                    y1 = height - inner_height * prev
+                    y2 = height - inner_height * value - trace_width
+                else:
+                    y1 = height - inner_height * prev - trace_width
+                    y2 = height - inner_height * value
+                ac.glVertex2f(x - trace_width, y1)
+                ac.glVertex2f(x, y1)
+                ac.glVertex2f(x, y2)
+                ac.glVertex2f(x - trace_width, y2)
+                prev = value
+            ac.glEnd()
+        ac.ext_restoreRenderTarget()
+
     def add_values(self, values):
-        if not self.render_target:
+        self.add_columns([values])
+
+    def add_columns(self, columns):
+        """
+        Add several samples at once, oldest first. Each column is a list of (prev, value, color).
+        The target is bound only once for the whole batch.
+        """
+        if not self.render_target or not columns:
+            return
+
+        # anything older than the graph width would scroll out of view immediately
+        if len(columns) > self.width:
+            columns = columns[-self.width:]
+
+        self._record(columns)
+
+        if self.ring_buffer:
+            self._add_columns_ring(columns)
             return
 
-        self._shift_left()
+        count = len(columns)
+        self._shift_left(count)
+        ac.ext_bindRenderTarget(self.render_target)
+        ac.ext_glSetBlendMode(0)
+        for i, values in enumerate(columns):
+            self._draw_column(self.width - count + 1 + i, values)
+        ac.ext_restoreRenderTarget()
+        ac.ext_generateMips(self.render_target)
+
+    def _add_columns_ring(self, columns):
+        head = self.head
+        count = len(columns)
+
         ac.ext_bindRenderTarget(self.render_target)
         ac.ext_glSetBlendMode(0)
 
+        # clear the oldest columns, the new samples take their place
+        ac.glColor4f(0, 0, 0, 0)
+        first = min(count, self.width - head)
+        ac.glQuad(head, 0, first, self.height)
+        if first < count:
+            ac.glQuad(0, 0, count - first, self.height)
+
+        for i, values in enumerate(columns):
+            x = (head + i) % self.width + 1
+            self._draw_column(x, values)
+            # thick traces near the left edge continue on the right side of the texture
+            if x < self.trace_width:
+                self._draw_column(x + self.width, values)
+
+        # render targets are created without mips, only the new columns changed so no regeneration
+        ac.ext_restoreRenderTarget()
+
+        self.head = (head + count) % self.width
+
+    def _draw_column(self, x, values):
+        """Draw the segments of one sample with their right edge at `x`"""
         inner_height = self.height - self.trace_width
         for (prev, value, color) in values:
             y1 = None
@@ -423,23 +913,20 @@ class CSPGraph:
                 y2 = self.height - inner_height * value
             
             ac.glColor4f(color[0], color[1], color[2], color[3])
-            if self.trace_width == 1:
+            if self.trace_width == 1 and not self.ring_buffer:
                 ac.glBegin(acsys.GL.Lines)
-                ac.glVertex2f(self.width, y1)
-                ac.glVertex2f(self.width, y2)
+                ac.glVertex2f(x, y1)
+                ac.glVertex2f(x, y2)
                 ac.glEnd()
             else:
                 ac.glBegin(acsys.GL.Quads)
-                ac.glVertex2f(self.width - self.trace_width, y1)
-                ac.glVertex2f(self.width, y1)
-                ac.glVertex2f(self.width, y2)
-                ac.glVertex2f(self.width - self.trace_width, y2)
+                ac.glVertex2f(x - self.trace_width, y1)
+                ac.glVertex2f(x, y1)
+                ac.glVertex2f(x, y2)
+                ac.glVertex2f(x - self.trace_width, y2)
                 ac.glEnd()
-                
-        ac.ext_restoreRenderTarget()
-        ac.ext_generateMips(self.render_target)
 
-    def _shift_left(self):
+    def _shift_left(self, pixels=1):
         if not self.render_target or not self.shift_target:
             return
         
@@ -452,11 +939,11 @@ class CSPGraph:
         ac.glBegin(acsys.GL.Quads)
         ac.ext_glSetTexture(self.render_target, 0)
         ac.glColor4f(1,1,1,1)
-        # shift all left by 1 px
-        ac.ext_glVertexTex(-1, 0, 0, 0)
-        ac.ext_glVertexTex(-1, self.height, 0, 1)
-        ac.ext_glVertexTex(self.width - 1, self.height, 1, 1)
-        ac.ext_glVertexTex(self.width - 1, 0, 1, 0)
+        # shift all left
+        ac.ext_glVertexTex(-pixels, 0, 0, 0)
+        ac.ext_glVertexTex(-pixels, self.height, 0, 1)
+        ac.ext_glVertexTex(self.width - pixels, self.height, 1, 1)
+        ac.ext_glVertexTex(self.width - pixels, 0, 1, 0)
         ac.glEnd()
         ac.ext_restoreRenderTarget()
 
@@ -472,18 +959,60 @@ class CSPGraph:
         ac.ext_glVertexTex(self.width, self.height, 1, 1)
         ac.ext_glVertexTex(self.width, 0, 1, 0)
         ac.glEnd()
+        ac.ext_restoreRenderTarget()
     
     def render(self):
         ac.glBegin(acsys.GL.Quads)
         ac.glColor4f(1,1,1,1)
         ac.ext_glSetTexture(self.render_target, 0)
-        ac.ext_glVertexTex(0 + self.x, 0 + self.y, 0, 0)
-        ac.ext_glVertexTex(0 + self.x, self.height + self.y, 0, 1)
-        ac.ext_glVertexTex(self.width + self.x, self.height + self.y, 1, 1)
-        ac.ext_glVertexTex(self.width + self.x, 0 + self.y, 1, 0)
+        if not self.ring_buffer or not self.head:
+            ac.ext_glVertexTex(0 + self.x, 0 + self.y, 0, 0)
+            ac.ext_glVertexTex(0 + self.x, self.height + self.y, 0, 1)
+            ac.ext_glVertexTex(self.width + self.x, self.height + self.y, 1, 1)
+            ac.ext_glVertexTex(self.width + self.x, 0 + self.y, 1, 0)
+        else:
+            # oldest samples, from the write head to the end of the texture
+            u = self.head / self.width
+            split_x = self.x + self.width - self.head
+            ac.ext_glVertexTex(self.x, self.y, u, 0)
+            ac.ext_glVertexTex(self.x, self.height + self.y, u, 1)
+            ac.ext_glVertexTex(split_x, self.height + self.y, 1, 1)
+            ac.ext_glVertexTex(split_x, self.y, 1, 0)
+            # newest samples, from the start of the texture up to the write head
+            ac.ext_glVertexTex(split_x, self.y, 0, 0)
+            ac.ext_glVertexTex(split_x, self.height + self.y, 0, 1)
+            ac.ext_glVertexTex(self.width + self.x, self.height + self.y, u, 1)
+            ac.ext_glVertexTex(self.width + self.x, self.y, u, 0)
         ac.glEnd()
 
 
+class QuadBatch:
+    """
+    Collects untextured quads of a render pass and draws them grouped by color,
+    so the color is set once per color instead of once per quad.
+    The draw order between quads is not kept, quads of one batch must not overlap.
+    """
+    def __init__(self):
+        self.groups = {}
+
+    def add(self, x, y, width, height, color):
+        if width <= 0 or height <= 0:
+            return
+
+        group = self.groups.get(color)
+        if group is None:
+            self.groups[color] = [(x, y, width, height)]
+        else:
+            group.append((x, y, width, height))
+
+    def draw(self):
+        for color, quads in self.groups.items():
+            ac.glColor4f(color[0], color[1], color[2], color[3])
+            for x, y, width, height in quads:
+                ac.glQuad(x, y, width, height)
+        self.groups.clear()
+
+
 class Pedals:
     def __init__(self, app_window, IS_CSP, config, telemetry=TelemetryData, x=0, y=0, height=100):
         self.IS_CSP = IS_CSP
@@ -492,14 +1021,14 @@ class Pedals:
         self.x = x
         self.y = y
         self.height = height
+        self.batch = QuadBatch()
 
-        self.font = 0
         self.throttle_label = None
         self.brake_label = None
         self.clutch_label = None
-        if self.IS_CSP:
-            self.font = ac.ext_glFontCreate('roboto', 1, 1, 1)
-        else:
+        # text currently set on each AC label
+        self.label_texts = {}
+        if not self.IS_CSP:
             self.throttle_label = ac.addLabel(app_window, '')
             self.brake_label = ac.addLabel(app_window, '')
             self.clutch_label = ac.addLabel(app_window, '')
@@ -564,78 +1093,90 @@ class Pedals:
         
         return bars * self.config.bar_width + (bars - 1) * self.gap_x
     
-    def update(self):
-        if not self.show_bars or self.IS_CSP or not self.config.show_bar_value:
-            return
+    def update_text(self):
+        """
+        Refresh the bar values. AC labels are only set when their text changed,
+        on CSP the labels to draw are returned as (text, x, y, size, color).
+        """
+        if not self.show_bars or not self.config.show_bar_value:
+            return []
         
-        for show, label, value in [
-            (self.config.show_throttle_bar, self.throttle_label, self.telemetry.throttle),
-            (self.config.show_brake_bar, self.brake_label, self.telemetry.brake),
-            (self.config.show_clutch_bar, self.clutch_label, self.telemetry.clutch),
-        ]:
-            if show and label:
-                rounded = round(value * 100)
-                ac.setText(label, '00' if rounded >= 100 else str(rounded))
+        if not self.IS_CSP:
+            for show, label, value in [
+                (self.config.show_throttle_bar, self.throttle_label, self.telemetry.throttle),
+                (self.config.show_brake_bar, self.brake_label, self.telemetry.brake),
+                (self.config.show_clutch_bar, self.clutch_label, self.telemetry.clutch),
+            ]:
+                if show and label:
+                    text = value_text(value)
+                    if self.label_texts.get(label) != text:
+                        self.label_texts[label] = text
+                        ac.setText(label, text)
+            return []
+
+        bar_width = self.config.bar_width
+        y = self.y - bar_width * 0.2
+        return [
+            (value_text(value), self.x + i * (bar_width + self.gap_x) + bar_width / 2, y, bar_width, (1, 1, 1, 1))
+            for i, (value, _) in enumerate(self._bars())
+        ]
+
+    def _bars(self):
+        """(value, color) of the enabled pedal bars, left to right"""
+        config = self.config
+        telemetry = self.telemetry
+        bars = [
+            (config.show_throttle_bar, telemetry.throttle, config.throttle_color),
+            (config.show_brake_bar, telemetry.brake, config.brake_color),
+            (config.show_clutch_bar, telemetry.clutch, config.clutch_color),
+            (self.IS_CSP and config.show_handbrake_bar, telemetry.handbrake, config.handbrake_color),
+        ]
+        return [rest for enabled, *rest in bars if enabled]
 
     def render(self):
         if not self.show_bars:
             return
         
-        bars = [
-            (self.config.show_throttle_bar, self.telemetry.throttle, self.config.throttle_color),
-            (self.config.show_brake_bar, self.telemetry.brake, self.config.brake_color),
-            (self.config.show_clutch_bar, self.telemetry.clutch, self.config.clutch_color),
-            (self.IS_CSP and self.config.show_handbrake_bar, self.telemetry.handbrake, self.config.handbrake_color),
-        ]
+        config = self.config
+        telemetry = self.telemetry
+        batch = self.batch
+        bar_width = config.bar_width
+        background = BAR_BACKGROUND + (config.opacity,)
+
         i = 0
-        for value, color in [rest for enabled, *rest in bars if enabled]:
-            x = self.x + i * (self.config.bar_width + self.gap_x)
+        for value, color in self._bars():
+            x = self.x + i * (bar_width + self.gap_x)
+            fill = (color[0], color[1], color[2], 1)
             
-            # bar background
-            ac.glColor4f(0.24, 0.24, 0.24, self.config.opacity)
-            ac.glQuad(x, self.bar_y, self.config.bar_width, self.bar_height)
-
+            # bar background only behind the empty part, so the quads never overlap
             height = self.bar_height * value
-            ac.glColor3f(color[0], color[1], color[2])
-            ac.glQuad(x, self.bar_y + self.bar_height - height, self.config.bar_width, height)
+            batch.add(x, self.bar_y, bar_width, self.bar_height - height, background)
+            batch.add(x, self.bar_y + self.bar_height - height, bar_width, height, fill)
 
             # end stop
-            if self.config.pedals_end_stop:
-                if value == 1: ac.glColor3f(color[0], color[1], color[2])
-                else: ac.glColor4f(0.24, 0.24, 0.24, self.config.opacity)
-                ac.glQuad(x, self.pedal_y, self.config.bar_width, self.end_height)
+            if config.pedals_end_stop:
+                batch.add(x, self.pedal_y, bar_width, self.end_height, fill if value == 1 else background)
             # base stop
-            if self.config.pedals_base_stop:
-                if value > 0: ac.glColor3f(color[0], color[1], color[2])
-                else: ac.glColor4f(0.24, 0.24, 0.24, self.config.opacity)
-                ac.glQuad(x, self.pedal_y + self.pedal_height - self.end_height, self.config.bar_width, self.end_height)
-
-            if self.IS_CSP and self.config.show_bar_value:
-                rounded = round(value * 100)
-                ac.ext_glFontColor(self.font, (1, 1, 1, 1))
-                ac.ext_glFontUse(
-                    self.font,
-                    '00' if rounded >= 100 else str(rounded),
-                    (x + self.config.bar_width / 2, self.y - self.config.bar_width * 0.2),
-                    self.config.bar_width,
-                    2
+            if config.pedals_base_stop:
+                batch.add(
+                    x, self.pedal_y + self.pedal_height - self.end_height, bar_width, self.end_height,
+                    fill if value > 0 else background
                 )
-            
+
             i += 1
         
-        if self.config.show_ffb_bar:
-            x = self.x + i * (self.config.bar_width + self.gap_x)
-
-            # bar background
-            ac.glColor4f(0.24, 0.24, 0.24, self.config.opacity)
-            ac.glQuad(x, self.pedal_y, self.config.bar_width, self.pedal_height)
+        if config.show_ffb_bar:
+            x = self.x + i * (bar_width + self.gap_x)
 
-            height = self.pedal_height * min(1, self.telemetry.ffb)
-            color = self.config.ffb_color
-            if self.telemetry.ffb >= 1:
+            height = self.pedal_height * min(1, telemetry.ffb)
+            color = config.ffb_color
+            if telemetry.ffb >= 1:
                 color = (0.8, 0.0, 0.0, 1.0)
-            ac.glColor3f(color[0], color[1], color[2])
-            ac.glQuad(x, self.pedal_y + self.pedal_height - height, self.config.bar_width, height)
+            batch.add(x, self.pedal_y, bar_width, self.pedal_height - height, background)
+            batch.add(x, self.pedal_y + self.pedal_height - height, bar_width, height, (color[0], color[1], color[2], 1))
+
+        batch.draw()
+
 
 class Wheel:
     def __init__(self, IS_CSP, config, telemetry=TelemetryData, x=0, y=0, size=100, depth=5, angle=20, color=(1, 1, 1, 1)):
@@ -651,9 +1192,9 @@ class Wheel:
 
         self.full_white_circle_texture = load_texture('img/white-circle.png')
 
-        self.font = 0
-        if self.IS_CSP:
-            self.font = ac.ext_glFontCreate('roboto', 1, 1, 1)
+        # last speed shown and its text
+        self._speed = None
+        self._speed_text = ''
         
         self.setup()
     
@@ -688,12 +1229,31 @@ class Wheel:
             self.y_unit = self.center_y - total_height / 2
             self.y_speed = self.center_y + total_height / 2 - self.speed_size
 
+        # marker vertices of the last quantized steering angle
+        self._marker_angle = None
+        self._marker = None
     
-    def _point(self, deg, offset):
-        x = self.x + self.radius + math.sin(math.radians(deg)) * offset
-        y = self.y + self.radius + math.cos(math.radians(deg)) * offset * -1
+    def _point(self, step, offset):
+        """Point at `offset` from the center, at an angle of `step` tenths of a degree"""
+        step %= TRIG_STEPS
+        x = self.x + self.radius + TRIG_SIN[step] * offset
+        y = self.y + self.radius - TRIG_COS[step] * offset
 
         return x, y
+
+    def _marker_vertices(self, steering):
+        angle = int(round(steering * TRIG_STEPS / 360))
+        if angle != self._marker_angle:
+            half = int(round(self.angle_offset * TRIG_STEPS / 360))
+            inner = self.radius - self.depth
+            self._marker = (
+                self._point(angle - half, inner),
+                self._point(angle + half, inner),
+                self._point(angle + half, self.radius),
+                self._point(angle - half, self.radius),
+            )
+            self._marker_angle = angle
+        return self._marker
     
     def render(self):
         ac.glColor4f(0.24, 0.24, 0.24, self.config.opacity)
@@ -702,37 +1262,38 @@ class Wheel:
         ac.glColor4f(0, 0, 0, min(1, self.config.opacity + 0.1))
         ac.glQuadTextured(self.x + self.depth, self.y + self.depth, self.inner_size, self.inner_size, self.full_white_circle_texture)
 
-        xbl, ybl = self._point(self.telemetry.steering - self.angle_offset, self.radius - self.depth)
-        xbr, ybr = self._point(self.telemetry.steering + self.angle_offset, self.radius - self.depth)
-        xtl, ytl = self._point(self.telemetry.steering - self.angle_offset, self.radius)
-        xtr, ytr = self._point(self.telemetry.steering + self.angle_offset, self.radius)
+        bl, br, tr, tl = self._marker_vertices(self.telemetry.steering)
 
         ac.glBegin(acsys.GL.Quads)
         ac.glColor4f(self.color[0], self.color[1], self.color[2], self.color[3])
-        ac.glVertex2f(xbl, ybl)
-        ac.glVertex2f(xbr, ybr)
-        ac.glVertex2f(xtr, ytr)
-        ac.glVertex2f(xtl, ytl)
+        ac.glVertex2f(bl[0], bl[1])
+        ac.glVertex2f(br[0], br[1])
+        ac.glVertex2f(tr[0], tr[1])
+        ac.glVertex2f(tl[0], tl[1])
         ac.glEnd()
 
-        if self.IS_CSP:
-            if self.config.wheel_show_gear:
-                ac.ext_glFontColor(self.font, (1, 1, 1, 1))
-                ac.ext_glFontUse(self.font, self.telemetry.gear_str, (self.center_x, self.y_gear) , self.gear_size, 2)
-            if self.config.wheel_show_speed:
-                ac.ext_glFontColor(self.font, (0.5, 0.5, 0.5, 1))
-                ac.ext_glFontUse(
-                    self.font,
-                    'KPH' if self.config.metric else 'MPH',
-                    (self.center_x, self.y_unit),
-                    self.unit_size,
-                    2
-                )
-                ac.ext_glFontColor(self.font, (1, 1, 1, 1))
-                ac.ext_glFontUse(
-                    self.font,
-                    str(round(self.telemetry.speed_kph if self.config.metric else self.telemetry.speed_mph)),
-                    (self.center_x, self.y_speed),
-                    self.speed_size,
-                    2
-                )
+    def update_text(self):
+        """Labels to draw on CSP as (text, x, y, size, color)"""
+        if not self.IS_CSP or not self.config.show_wheel:
+            return []
+
+        config = self.config
+        telemetry = self.telemetry
+        labels = []
+        if config.wheel_show_gear:
+            labels.append((telemetry.gear_str, self.center_x, self.y_gear, self.gear_size, (1, 1, 1, 1)))
+        if config.wheel_show_delta and telemetry.delta.valid:
+            delta = telemetry.delta.delta
+            labels.append((
+                '{:+.2f}'.format(delta), self.center_x, self.y_unit, self.unit_size,
+                (0.2, 0.9, 0.2, 1) if delta <= 0 else (0.9, 0.2, 0.2, 1)
+            ))
+        elif config.wheel_show_speed:
+            labels.append(('KPH' if config.metric else 'MPH', self.center_x, self.y_unit, self.unit_size, (0.5, 0.5, 0.5, 1)))
+        if config.wheel_show_speed:
+            speed = round(telemetry.speed_kph if config.metric else telemetry.speed_mph)
+            if speed != self._speed:
+                self._speed = speed
+                self._speed_text = str(speed)
+            labels.append((self._speed_text, self.center_x, self.y_speed, self.speed_size, (1, 1, 1, 1)))
+        return labels
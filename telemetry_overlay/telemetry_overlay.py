@@ -3,6 +3,7 @@ import os
 
 dir_root = os.path.dirname(__file__)
 config_path = os.path.join(dir_root, 'config.ini')
+recordings_path = os.path.join(dir_root, 'recordings')
 
 from _telemetry_overlay.app import App
 from _telemetry_overlay.utils import console_exception
@@ -53,5 +54,10 @@ def acShutDown():
         return
 
     # make sure that changes are always saved
-    if app_state.config and app_state.config.update_cfg:
-        app_state.config.save()
+    if app_state.config:
+        app_state.config.save_changes(force=True)
+        app_state.config.writer.wait(2)
+
+    if app_state.recorder:
+        app_state.recorder.close()
+        app_state.recorder.wait(2)